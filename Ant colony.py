@@ -1,15 +1,43 @@
-from msilib import sequence
-from unittest import result
 from generator import Generator
 from ant import Ant
-from utilities import generatePheromonesMatrix, generateWeightsMatrix, createTranslation, mergeSolution, levenshteinDistance
-from copy import deepcopy
+from instance import Instance, loadInstance
+from graph import candidateLists
+from utilities import generateGraph, mergeRoute
+from scoring import myersDistance, routeFingerprint, ScoreCache
+from random import Random
+from time import perf_counter
+from parallel import AntPool
+from metrics import Metrics, NullMetrics, JsonLinesSink
+from batch import BatchedColony
+from localsearch import LocalSearch
+from checkpoint import CheckpointWriter, readCheckpoint, restoreColony
 
 
 
 class AntColony:
+    # all - every ant deposits, iteration-best - best ant of iteration, global-best - best ant so far (MMAS)
+    DEPOSIT_POLICIES = ("all", "iteration-best", "global-best")
+    # ant - Ant objects one by one (or in pool of processes), batched - all ants in lockstep with NumPy
+    ENGINES = ("ant", "batched")
+
     def __init__(self, ant_count: int = 50, alpha: int = 12, evaporation_coefficient: float = 0.4,
-                 iterations: int = 80, sequence_length: int = 500, oligo_size: int = 9, percent: float = 0.05):
+                 iterations: int = 80, sequence_length: int = 500, oligo_size: int = 9, percent: float = 0.05,
+                 dense_limit: int = 2000, max_weight: int = None, shared_state: bool = True,
+                 candidate_count: int = None, beta: float = 1.0, seed=None, workers: int = 1,
+                 deposit_policy: str = "all", pheromone_min: float = 0.0, pheromone_max: float = 100,
+                 score_cache_size: int = 4096, instance=None, engine: str = "ant", stop_on_exact: bool = True,
+                 stagnation: int = None, min_branching: float = None, branching_ratio: float = 0.05,
+                 time_limit: float = None, metrics: bool = False, local_search: bool = False,
+                 local_search_radius: int = 10, checkpoint: str = None, checkpoint_interval: int = 10,
+                 branching_interval: int = 10):
+        if engine not in self.ENGINES:
+            raise ValueError(f"unknown engine {engine}, expected one of {self.ENGINES}")
+        if deposit_policy not in self.DEPOSIT_POLICIES:
+            raise ValueError(f"unknown deposit policy {deposit_policy}, expected one of {self.DEPOSIT_POLICIES}")
+        if branching_interval < 1:
+            raise ValueError("branching interval must be positive")
+        if checkpoint_interval < 1:
+            raise ValueError("checkpoint interval must be positive")
         self.percent = percent
         self.oligo_size = oligo_size
         self.sequence_length = sequence_length
@@ -17,8 +45,50 @@ class AntColony:
         self.ant_count = ant_count
         self.iterations = iterations
         self.evaporation_coefficient = evaporation_coefficient
+        self.dense_limit = dense_limit
+        self.max_weight = max_weight
+        self.shared_state = shared_state
+        self.candidate_count = candidate_count
+        self.beta = beta
+        self.workers = workers
+        self.deposit_policy = deposit_policy
+        self.pheromone_min = pheromone_min
+        self.pheromone_max = pheromone_max
+        self.score_cache = ScoreCache(score_cache_size)
+        # instance file path or Instance solved instead of generated instance
+        self.instance_source = instance
+        self.instance = None
+        self.random = Random(seed)
+        self.engine = engine
+        # stopping criteria, None disables criterion - see _stopReason
+        self.stop_on_exact = stop_on_exact
+        self.stagnation = stagnation
+        self.min_branching = min_branching
+        self.branching_ratio = branching_ratio
+        # branching factor is a pass over all pheromones, so convergence is checked every branching_interval
+        self.branching_interval = branching_interval
+        self.time_limit = time_limit
+        self.iteration = 0
+        self.improved_at = 0
+        self.started_at = None
+        self.stop_reason = None
+        # per-phase timers and counters (see metrics.py), hooks receive event after every iteration
+        self.metrics = Metrics() if metrics else NullMetrics()
+        self.hooks = []
+        # iteration-best route is improved by swap, relocate and or-opt moves before deposit (see localsearch.py)
+        self.local_search = local_search
+        self.local_search_radius = local_search_radius
+        self.improver = None
+        # directory of periodic checkpoints (see checkpoint.py), state of resumed run is applied in start
+        self.checkpoint_path = checkpoint
+        self.checkpoint_interval = checkpoint_interval
+        self.checkpointer = None
+        self.resume_state = None
+        self.batched = None
+        self.pool = None
         self.best_result = 10000000000000
         self.best_solution = None
+        self.best_deposits = None
         self.ants = None
         self.first_attempt = True
 
@@ -27,93 +97,343 @@ class AntColony:
         self.initial_solution = None
         self.ranges = None
 
-        self.weights = None
-        self.translation = None
-        self.pheromones_map = None
+        self.graph = None
+        self.candidates = None
 
     def _initGenerator(self):
-        self.generator = Generator(self.sequence_length, self.oligo_size, self.percent)
-        self.generator.generateSequence()
-        self.starter = self.generator.starter
-        self.initial_solution = self.generator.getSpectrum()
-        self.ranges = self.generator.oligoDict
+        """
+        generate new instance or load given one (see instance.py)
+        """
+        if isinstance(self.instance_source, str):
+            self.instance = loadInstance(self.instance_source)
+        elif self.instance_source is not None:
+            self.instance = self.instance_source
+        else:
+            self.generator = Generator(self.sequence_length, self.oligo_size, self.percent,
+                                       seed=self.random.getrandbits(64))
+            self.generator.generateSequence()
+            self.instance = Instance.fromGenerator(self.generator)
+        self.sequence_length = self.instance.dnaLength
+        self.oligo_size = self.instance.oligoLength
+        self.initial_solution = self.instance.spectrum
+        self.starter = self.instance.starterNode
 
     def _initArea(self):
-        self.weights = generateWeightsMatrix(self.sequence_length, self.initial_solution)
-        self.translation = createTranslation(self.initial_solution)
-        self.pheromones_map = generatePheromonesMatrix(self.sequence_length)
+        self.graph = self.instance.graph()
+        if self.graph is None:
+            self.graph = generateGraph(self.initial_solution, self.dense_limit, self.max_weight)
+        self.graph.setBounds(self.pheromone_min, self.pheromone_max)
+        self.ranges = self.instance.ranges
+        if self.candidate_count is not None:
+            self.candidates = candidateLists(self.graph, self.candidate_count)
+
+    def _createAnt(self, firstAttempt: bool, seed: int = None):
+        """
+        create ant - in shared state mode ant reads colony graph, spectrum and ranges directly,
+        its own changes (visited nodes, used ranges, deposits) are kept inside ant
 
-    def _createAnt(self, firstAttempt: bool):
+        :param firstAttempt: when true random choices are enabled
+        :param seed: seed of ant random numbers generator
+        :return: ant
+        """
         starer = self.starter
-        initial_solution = deepcopy(self.initial_solution)
-        weights = deepcopy(self.weights)
-        translation = self.translation
-        pheromones_map = deepcopy(self.pheromones_map)
-        ranges = deepcopy(self.ranges)
+        if self.shared_state:
+            initial_solution = self.initial_solution
+            graph = self.graph
+            ranges = self.ranges
+        else:
+            # copy() instead of deepcopy - memoryviews of memory mapped instance can not be pickled
+            initial_solution = self.initial_solution.copy()
+            graph = self.graph.copy()
+            ranges = self.ranges.copy()
         sequence_length = self.sequence_length
         alpha = self.alpha
-        ant = Ant(starer, initial_solution, weights, translation, pheromones_map, ranges, sequence_length, alpha, firstAttempt)
+        ant = Ant(starer, initial_solution, graph, ranges, sequence_length, alpha, firstAttempt,
+                  self.candidates, self.beta, Random(seed), self.metrics)
         return ant
 
+    def _antSeeds(self):
+        """
+        seeds of ants are drawn by colony, so run with given seed does not depend on number of workers
+
+        :return: list of seeds, one for every ant
+        """
+        return [self.random.getrandbits(64) for _ in range(self.ant_count)]
+
     def _init_ants(self):
 
         ant_list = []
+        seeds = self._antSeeds()
         if self.first_attempt:
             self.first_attempt = False
-            for ant in range(self.ant_count):
-                new_ant = self._createAnt(True)
+            for seed in seeds:
+                new_ant = self._createAnt(True, seed)
                 ant_list.append(new_ant)
             return ant_list
 
-        for ant in range(self.ant_count):
-            new_ant = self._createAnt(False)
+        for seed in seeds:
+            new_ant = self._createAnt(False, seed)
             ant_list.append(new_ant)
         return ant_list
 
-    def _updatePheromonesMap(self, pheromones_maps: list):
-        for pheromones_map in pheromones_maps:
-            for i in range(self.sequence_length):
-                for j in range(self.sequence_length):
-                    if self.pheromones_map[i][j] > 100:
-                        self.pheromones_map[i][j] = 100
-                    else:
-                        self.pheromones_map[i][j] += pheromones_map[i][j]
-
-        for i in range(self.sequence_length):
-            for j in range(self.sequence_length):
-                self.pheromones_map[i][j] *= (1 - self.evaporation_coefficient)
-
-    def _bestSolution(self, solution):
-        new_solution = mergeSolution(solution, self.oligo_size)
-        #print(f"solution: {self.generator.sequence}")
+    def _initPool(self):
+        state = {"starter": self.starter, "spectrum": self.initial_solution, "ranges": self.ranges,
+                 "sequence_length": self.sequence_length, "alpha": self.alpha, "candidates": self.candidates,
+                 "beta": self.beta}
+        if self.instance.path is not None:
+            # workers map the same instance file instead of receiving its arrays
+            state.update(spectrum=None, ranges=None, instance_path=self.instance.path)
+        self.pool = AntPool(self.workers, self.graph, state, self.metrics)
+
+    def _runAnts(self):
+        """
+        run ants of iteration - one by one, in pool of processes when workers > 1 or in lockstep by batched engine
+
+        :return: list of (route, deposits) of every ant
+        """
+        if self.batched is not None:
+            firstAttempt = self.first_attempt
+            self.first_attempt = False
+            return self.batched.run(firstAttempt, self.random.getrandbits(64))
+
+        if self.pool is None:
+            self.ants = self._init_ants()
+            return [ant.run() for ant in self.ants]
+
+        firstAttempt = self.first_attempt
+        self.first_attempt = False
+        return self.pool.run(self._antSeeds(), firstAttempt)
+
+    def _updatePheromonesMap(self, deposits: list, results: list = None):
+        """
+        evaporate pheromones and apply deposits of ants chosen by deposit policy,
+        only edges visited by chosen ants are changed
+
+        :param deposits: deposits of every ant of iteration e.g. [{(0, 1): 24}, {(3, 2): 12}]
+        :param results: Levenshtein distance of every ant of iteration, needed by iteration-best policy
+        """
+        if self.deposit_policy == "iteration-best":
+            deposits = [deposits[results.index(min(results))]]
+        elif self.deposit_policy == "global-best":
+            deposits = [self.best_deposits]
+
+        self.graph.evaporate(self.evaporation_coefficient)
+        for ant_deposits in deposits:
+            self.graph.depositAll(ant_deposits)
+
+    def _scoreLimit(self, results: list):
+        """
+        distance above which exact score of ant is not needed - ant is neither new best nor best of iteration,
+        best of iteration is needed only by iteration-best policy, local search and hooks (iteration_best)
+
+        :param results: scores of previous ants of iteration
+        :return: limit for myersDistance or None when exact score is needed
+        """
+        if self.deposit_policy != "iteration-best" and self.improver is None and not self.hooks:
+            return self.best_result - 1
+        if not results:
+            return None
+        return max(self.best_result - 1, min(results))
+
+    def _bestSolution(self, solution, deposits: dict = None, limit: int = None):
+        """
+        score solution and remember it if it is the best so far
+
+        :param solution: route of ant (node numbers)
+        :param deposits: deposits of ant
+        :param limit: distance above which scoring stops early, returned score is then limit + 1
+        :return: Levenshtein distance between solution and sequence
+        """
+        key = routeFingerprint(solution)
+        cached = self.score_cache.get(key, limit)
+        if cached is not None:
+            # route was already scored - it can not be better than best solution
+            return cached
+
+        with self.metrics.timer("merge"):
+            new_solution = mergeRoute(solution, self.initial_solution, self.graph)
+        #print(f"solution: {self.instance.sequence}")
         #print(f"new solution: {new_solution}\n")
-        result = levenshteinDistance(new_solution, self.generator.sequence)
+        with self.metrics.timer("distance"):
+            result = myersDistance(new_solution, self.instance.sequence, limit)
+        self.score_cache.put(key, result, limit is None or result <= limit)
         #print(result)
         if result < self.best_result:
              self.best_result = result
              self.best_solution = new_solution
+             self.best_deposits = deposits
+        return result
         
-    def mainloop(self):
+    def migrate(self, result: int, solution: str, deposits: dict):
+        """
+        accept best solution of other colony (island model, see islands.py) - its route is deposited on own graph
+        and it becomes best solution when it is better than own one
+
+        :param result: Levenshtein distance of migrant solution
+        :param solution: migrant solution
+        :param deposits: deposits of migrant route
+        """
+        if deposits:
+            self.graph.depositAll(deposits)
+        if result < self.best_result:
+            self.best_result = result
+            self.best_solution = solution
+            self.best_deposits = deposits
+
+    def start(self):
+        """
+        prepare instance, graph and engine of ants, must be called before step
+        """
+        self.started_at = perf_counter()
         self._initGenerator()
         self._initArea()
-        self.ants = self._init_ants()
-        for iteration in range(self.iterations):
-            print(f"iteration {iteration}")
-            pheromones_maps = []
-            #print(pheromones_maps)
-            for ant in self.ants:
-                solution, pheromones_map = ant.run()
-                pheromones_maps.append(pheromones_map)
-                self._bestSolution(solution)
-            self._updatePheromonesMap(pheromones_maps)
-            self.ants = self._init_ants()
-        return self.best_solution
+        if self.local_search:
+            self.improver = LocalSearch(self.graph, self.ranges, self.local_search_radius)
+        if self.engine == "batched":
+            self.batched = BatchedColony(self.graph, self.ranges, self.starter, self.sequence_length, self.alpha,
+                                         self.ant_count, self.candidates, self.beta, self.metrics)
+        elif self.workers > 1:
+            self._initPool()
+        if self.resume_state is not None:
+            restoreColony(self, *self.resume_state)
+            self.resume_state = None
+        if self.checkpoint_path is not None:
+            self.checkpointer = CheckpointWriter(self.checkpoint_path)
+
+    def step(self):
+        """
+        run one iteration - ants, scoring and pheromone update
+        """
+        previous = self.best_result
+        deposits = []
+        results = []
+        with self.metrics.timer("ants"):
+            ant_results = self._runAnts()
+        with self.metrics.timer("scoring"):
+            for solution, ant_deposits in ant_results:
+                deposits.append(ant_deposits)
+                results.append(self._bestSolution(solution, ant_deposits, self._scoreLimit(results)))
+                self.metrics.observe("route_length", len(solution))
+        if self.improver is not None:
+            with self.metrics.timer("local_search"):
+                self._improveIterationBest(ant_results, deposits, results)
+        with self.metrics.timer("pheromones"):
+            self._updatePheromonesMap(deposits, results)
+        self.iteration += 1
+        if self.best_result < previous:
+            self.improved_at = self.iteration
+        if self.hooks:
+            self._emit({"event": "iteration", "iteration": self.iteration, "best_result": self.best_result,
+                        "iteration_best": min(results), "elapsed": perf_counter() - self.started_at,
+                        "cache_hits": self.score_cache.hits, "cache_misses": self.score_cache.misses,
+                        "metrics": self.metrics.snapshot()})
+
+    def _improveIterationBest(self, ant_results: list, deposits: list, results: list):
+        """
+        improve route of the best ant of iteration with local search, improved route replaces it
+        (route deposits and score) when its Levenshtein distance is not worse
+
+        :param ant_results: (route, deposits) of every ant of iteration
+        :param deposits: deposits of every ant, changed in place
+        :param results: scores of every ant, changed in place
+        """
+        best = results.index(min(results))
+        route, applied = self.improver.improve(ant_results[best][0])
+        self.metrics.count("local_search_moves", applied)
+        if not applied:
+            return
+        route_deposits = {}
+        for edge in zip(route, route[1:]):
+            route_deposits[edge] = route_deposits.get(edge, 0) + self.alpha
+        result = self._bestSolution(route, route_deposits, results[best])
+        if result <= results[best]:
+            deposits[best] = route_deposits
+            results[best] = result
+
+    def addHook(self, hook):
+        """
+        :param hook: callable receiving event dictionary after every iteration and after stop
+        e.g. {"event": "iteration", "iteration": 3, "best_result": 40, ..} - see metrics.JsonLinesSink
+        """
+        self.hooks.append(hook)
+
+    def _emit(self, event: dict):
+        for hook in self.hooks:
+            hook(event)
+
+    def _stopReason(self):
+        """
+        check stopping criteria after iteration, the cheapest criteria are checked first
+
+        :return: "exact" - sequence reconstructed, "time" - time limit exceeded, "stagnation" - best result did not
+        improve for stagnation iterations, "converged" - branching factor (checked every branching_interval
+        iterations) dropped to min_branching, "iterations" - all iterations done, None - colony should continue
+        """
+        if self.stop_on_exact and self.best_result == 0:
+            return "exact"
+        if self.time_limit is not None and perf_counter() - self.started_at >= self.time_limit:
+            return "time"
+        if self.stagnation is not None and self.iteration - self.improved_at >= self.stagnation:
+            return "stagnation"
+        if self.min_branching is not None and self.iteration % self.branching_interval == 0 \
+                and self.graph.branchingFactor(self.branching_ratio) <= self.min_branching:
+            return "converged"
+        if self.iteration >= self.iterations:
+            return "iterations"
+        return None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+        if self.checkpointer is not None:
+            self.checkpointer.close()
+            self.checkpointer = None
+
+    @classmethod
+    def resume(cls, path: str):
+        """
+        create colony continuing run from its last checkpoint, mainloop of returned colony gives the same result
+        as run which was not interrupted
+
+        :param path: checkpoint directory
+        :return: AntColony
+        """
+        header, pheromones, instance = readCheckpoint(path)
+        colony = cls(instance=instance, checkpoint=path, **header["config"])
+        colony.resume_state = (header, pheromones)
+        return colony
+
+    def mainloop(self):
+        """
+        run iterations until one of stopping criteria is met
+
+        :return: (best solution, reason of stop - see _stopReason)
+        """
+        self.start()
+        try:
+            # resumed run may be already finished
+            self.stop_reason = self._stopReason()
+            while self.stop_reason is None:
+                self.step()
+                self.stop_reason = self._stopReason()
+                if self.checkpointer is not None and (self.stop_reason is not None
+                                                      or self.iteration % self.checkpoint_interval == 0):
+                    self.checkpointer.submit(self)
+        finally:
+            self.close()
+        if self.hooks:
+            self._emit({"event": "stop", "iteration": self.iteration, "best_result": self.best_result,
+                        "stop_reason": self.stop_reason, "elapsed": perf_counter() - self.started_at,
+                        "metrics": self.metrics.snapshot()})
+        return self.best_solution, self.stop_reason
 
 
 if __name__ == "__main__":
     ant_count = 5; iterations = 10; sequence_length = 200; oligo_size = 5
     alpha = 10; evaporation_coeff = 0.5; percent = 0.1
-    ant_colony = AntColony(ant_count = ant_count, iterations = iterations, sequence_length = sequence_length, oligo_size = oligo_size)
-    best = ant_colony.mainloop()
-    print(best)
+    ant_colony = AntColony(ant_count = ant_count, iterations = iterations, sequence_length = sequence_length, oligo_size = oligo_size, metrics = True)
+    ant_colony.addHook(JsonLinesSink())
+    best, reason = ant_colony.mainloop()
+    print(best, reason)
     print(ant_colony.best_result /2)
@@ -1,30 +1,39 @@
-from copy import deepcopy
 from email import generator
 from threading import Thread
-from random import choice, choices
+from array import array
+import random
 from generator import Generator
+from ranges import RangeCursor
+from metrics import NullMetrics
 from utilities import *
 
 
 # callback_function triggers when length of path riches length od DNA sequence
 # (Thread)
 class Ant:
-    def __init__(self, starting_point: str, nodes: list, weights: list, translations: dict, pheromones_map: list,
-                 ranges_dict: dict, sequenceLength: int, alpha: float, first_attempt=False):
+    def __init__(self, starting_point: int, nodes, graph,
+                 ranges, sequenceLength: int, alpha: float, first_attempt=False, candidates: list = None,
+                 beta: float = 1.0, rng: random.Random = None, metrics=None):
         """
         initialize ant graph traverse
 
-        :param starting_point: ant starting point e.g "ATCG"
+        :param starting_point: ant starting node number e.g 0
         :param sequenceLength: length of DNA sequence
-        :param nodes: nodes which can be visited - during journey its number decrease (visited nodes) e.g. ["ACT", "AGT" ..]
-        :param weights: matrix of weights - value of difference between oligonucleotides e.g.[[1, 3, 4][1, 2, 4][7, 10, 1]]
-        :param translations: dictionary binding nodes names(oligonucleotides names) with weights e.g. {"ACT": 0, "AGT": 1}
-        :param pheromones_map: pheromone trace to change choice probability e.g. [[0,0,0.1][0,0.2,0][1,0.5,0.2]]
-        :param ranges_dict: holds ranges defining when some node should be visited e.g{"ACT": [0, 3, 7, 13], "AGT": [4, 7]}
+        :param nodes: spectrum (EncodedSpectrum) - ant visits node numbers 0 .. len(nodes) - 1,
+        during journey number of nodes which can be visited decreases (visited nodes)
+        :param graph: overlap graph (OverlapGraph or DenseGraph) holding weights - value of difference between
+        oligonucleotides and pheromone trace to change choice probability, graph is only read during journey
+        :param ranges: RangeIndex holding ranges defining when some node should be visited, shared by ants
         :param alpha: pheromone rate
         :param first_attempt: when true random choices are enabled
-
-        :parameter route: store visited nodes
+        :param candidates: optional candidate lists - best successors of every node, when given ant chooses from them
+        first and choice is base on pheromone and inverse weight heuristic
+        :param beta: importance of inverse weight heuristic in candidate lists mode
+        :param rng: random numbers generator of ant, module random is used when not given
+        :param metrics: Metrics counting fallback choices, candidate list misses and revisited nodes (see metrics.py)
+
+        :parameter route: store visited node numbers (array of integers)
+        :parameter deposits: pheromones left by ant e.g. {(0, 1): 24} - applied to graph by colony
         :parameter stop_walk: flag indicating if traversal is finished
         :parameter sequence_cover: sum of weights during traversal if reaches limit (value of DNA length) ant stops
         """
@@ -33,14 +42,18 @@ class Ant:
         self.sequenceLength = sequenceLength
         self.starting_point = starting_point
         self.current_location = starting_point
-        self.nodes = nodes
-        self.weights = weights
-        self.translations = translations
-        self.pheromones_map = pheromones_map
-        self.ranges = ranges_dict
+        self.spectrum = nodes
+        self.nodes = dict.fromkeys(range(len(nodes)))
+        self.graph = graph
+        self.ranges = RangeCursor(ranges)
         self.first_attempt = first_attempt
         self.alpha = alpha
-        self.route = []
+        self.candidates = candidates
+        self.beta = beta
+        self.random = rng if rng is not None else random
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        self.route = array('i')
+        self.deposits = {}
         self.sequence_cover = 0
 
     def run(self):
@@ -52,75 +65,86 @@ class Ant:
             moveTo = self._choosePath()
             self._move(moveTo)
 
-        return self.route, self.pheromones_map
+        return self.route, self.deposits
 
     def _verifyPath(self, node):
         """
         verify if node can be chosen - self.sequence between ranges
 
-        :param node: oligonucleotide name e.g. "ATCGAT"
+        :param node: node number
         :return: flag indicating if node can be chosen
         """
 
-        for counter in range(0, len(self.ranges[node]), 2):
-            if self.ranges[node][counter] <= self.sequence_cover <= self.ranges[node][counter + 1]:
-                self.ranges[node].remove(self.ranges[node][counter + 1])
-                self.ranges[node].remove(self.ranges[node][counter])
-                #print("tutaj")
-                return True, node
-        return False, node
+        return self.ranges.consume(node, self.sequence_cover), node
 
     def _getWeights(self, nodes: list):
-        base_list = self.pheromones_map[self.translations[self.current_location]]
-        index_list = [self.translations[element] for element in nodes]
-        final_list = []
-        for index in index_list:
-            final_list.append(base_list[index])
-        return final_list
+        current = self.current_location
+        return [self.graph.pheromone(current, node) for node in nodes]
 
-    def _choosePath(self):
+    def _getHeuristicWeights(self, nodes: list):
         """
-        During first attempt algorithm search for node to which ant can go at random
-
-        Each other attempt choose random path but choice is base on pheromone weights
+        :param nodes: node numbers
+        :return: list of pheromone * (1 / weight) ^ beta for every node
+        """
+        current = self.current_location
+        return [self.graph.pheromone(current, node) * (1 / self.graph.weight(current, node)) ** self.beta
+                for node in nodes]
 
-        :var node: represents oligonucleotide name
-        :var alreadyChecked: list of rejected nucleotides
-        :var go: flag indicating finding next move
-        :var pheromonesForCurrentNode: list of pheromone weights
-        :var oligonucleotide: chosen oligonucleotide
+    def _chooseCandidate(self):
+        """
+        choose node from candidate list of current node - only nodes with range containing sequence_cover are taken,
+        when none of them is valid every valid node is taken
 
-        :return: node name
+        :return: node number or None if no node is valid
         """
-        node = None
-        alreadyChecked = []
-        go = False
-        counter = 0
-        nodes = deepcopy(self.nodes)
+        eligible = [node for node in self.candidates[self.current_location] if node in self.ranges.open]
+        if not eligible:
+            self.metrics.count("candidate_miss")
+            eligible = list(self.ranges.open)
+            if not eligible:
+                return None
 
         if self.first_attempt:
-            while not go:
-                oligonucleotide = choice(self.nodes)
-                if oligonucleotide not in alreadyChecked:
-                    go, node = self._verifyPath(oligonucleotide)
-                    #print(go)
-                    alreadyChecked.append(node)
+            node = self.random.choice(eligible)
+        else:
+            [node] = self.random.choices(eligible, weights=self._getHeuristicWeights(eligible), k=1)
+        self._verifyPath(node)
+        return node
+
+    def _choosePath(self):
+        """
+        Candidates are narrowed to nodes which have unused range containing sequence_cover, then one node is drawn
+
+        During first attempt node is drawn at random, each other attempt choice is base on pheromone weights.
+        In candidate lists mode candidates of current node are tried first (see _chooseCandidate).
+        When no node is valid ant goes to random remaining node (drawn with pheromone weights) without using its range
+
+        :var candidates: node numbers which can be chosen at current sequence_cover
+        :var node: chosen node number
+
+        :return: node number
+        """
+        self.ranges.advance(self.sequence_cover)
+        if self.candidates is not None:
+            node = self._chooseCandidate()
+            if node is not None:
+                return node
+
+        candidates = list(self.ranges.open)
+
+        if not candidates:
+            self.metrics.count("fallback")
+            nodes = list(self.nodes) or range(len(self.spectrum))
+            if self.first_attempt:
+                return self.random.choice(nodes)
+            [node] = self.random.choices(nodes, weights=self._getWeights(nodes), k=1)
             return node
 
-        pheromonesForCurrentNode = self._getWeights(nodes)
-        # print(pheromonesForCurrentNode)
-        while not go:
-            [oligonucleotide] = choices(nodes, weights=pheromonesForCurrentNode, k=1)
-            #print(oligonucleotide)
-            if oligonucleotide not in alreadyChecked:
-                #print(oligonucleotide)
-                #print(alreadyChecked)
-                go, node = self._verifyPath(oligonucleotide)
-                #print(go)
-                alreadyChecked.append(node)
-            if counter > 3 * self.sequenceLength:
-                return oligonucleotide
-            counter += 1
+        if self.first_attempt:
+            node = self.random.choice(candidates)
+        else:
+            [node] = self.random.choices(candidates, weights=self._getWeights(candidates), k=1)
+        self._verifyPath(node)
         return node
 
     def _updatePath(self, moveTo):
@@ -130,27 +154,29 @@ class Ant:
         :param moveTo: chosen node
         """
         self.route.append(moveTo)
-        if not self.ranges[moveTo]:
+        if not self.ranges.remaining[moveTo]:
             if moveTo in self.nodes:
-                self.nodes.remove(moveTo)
+                del self.nodes[moveTo]
             else:
-                print("positive")
+                self.metrics.count("revisit")
         #print(self.ranges)
 
     def _updateSequence(self, moveTo):
         """
         Update sequence cover base on distance between nodes and mark path with pheromones
-        :param moveTo: chosen oligonucleotide
+        :param moveTo: chosen node number
         """
-        self.sequence_cover += self.weights[self.translations[self.current_location]][self.translations[moveTo]]
+        current = self.current_location
+        self.sequence_cover += self.graph.weight(current, moveTo)
         # print(self.sequence_cover)
-        self.pheromones_map[self.translations[self.current_location]][self.translations[moveTo]] += self.alpha
+        edge = (current, moveTo)
+        self.deposits[edge] = self.deposits.get(edge, 0) + self.alpha
 
     def _move(self, moveTo):
         """
         Perform general ant movement action
 
-        :param moveTo: chosen oligonucleotide
+        :param moveTo: chosen node number
         """
         self._updatePath(moveTo)
         self._updateSequence(moveTo)
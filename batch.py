@@ -0,0 +1,177 @@
+from array import array
+from graph import OverlapGraph
+from metrics import NullMetrics
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class BatchedColony:
+    """
+    Alternative to Ant class - all ants of iteration are advanced together in lockstep
+
+    State of every ant (current node, sequence_cover, used occurrences, remaining occurrences) is kept in
+    NumPy arrays, so one step of whole colony is a few array operations: gather pheromone rows, mask nodes
+    which have no open range, cumulative sum and batched inverse-CDF sampling. Route semantics are the same
+    as in Ant: node with unused range containing sequence_cover is drawn with pheromone weights (random on first
+    attempt, pheromone * (1 / weight) ^ beta with candidate lists tried first in candidate lists mode),
+    when no node is valid ant goes to remaining node without using its range.
+
+    Graph is gathered into dense matrices, so engine is meant for spectra which fit n x n arrays.
+    Requires NumPy.
+
+    ___ATTRIBUTES___
+    self.graph - colony graph (OverlapGraph or DenseGraph)
+    self.ranges - RangeIndex
+    self.starter - starting node number
+    self.sequenceLength - length of DNA sequence
+    self.alpha - pheromone rate
+    self.antCount - number of ants
+    self.beta - importance of inverse weight heuristic in candidate lists mode
+    self.weights - dense weights matrix
+    self.candidates - boolean matrix of candidate lists or None
+    self.metrics - Metrics counting fallback choices (see metrics.py)
+
+     ___METHODS___
+    run(self, firstAttempt, seed) - run all ants, returns list of (route, deposits)
+    """
+
+    def __init__(self, graph, ranges, starter: int, sequenceLength: int, alpha: float, antCount: int,
+                 candidates: list = None, beta: float = 1.0, metrics=None):
+        if np is None:
+            raise ImportError("batched engine requires NumPy")
+
+        self.graph = graph
+        self.ranges = ranges
+        self.starter = starter
+        self.sequenceLength = sequenceLength
+        self.alpha = alpha
+        self.antCount = antCount
+        self.beta = beta
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        size = graph.size
+
+        if isinstance(graph, OverlapGraph):
+            self.weights = np.full((size, size), graph.oligoLength, dtype=np.int16)
+            indptr = np.asarray(graph.indptr, dtype=np.int64)
+            rows = np.repeat(np.arange(size), np.diff(indptr))
+            self.weights[rows, np.asarray(graph.indices)] = np.asarray(graph.weights)
+        else:
+            self.weights = np.asarray(graph.weights, dtype=np.int16).reshape(size, size)
+
+        self.candidates = None
+        if candidates is not None:
+            self.candidates = np.zeros((size, size), dtype=bool)
+            for node, successors in enumerate(candidates):
+                self.candidates[node, successors] = True
+
+        self._lows = np.asarray(ranges.lows, dtype=np.int64)
+        self._highs = np.asarray(ranges.highs, dtype=np.int64)
+        self._occurrenceNodes = np.asarray(ranges.nodes, dtype=np.int64)
+        self._starts = np.asarray(ranges.starts, dtype=np.int64)[:-1]
+        self._counts = np.diff(np.asarray(ranges.starts, dtype=np.int64))
+
+    def _pheromones(self):
+        """
+        :return: dense matrix of real pheromone values
+        """
+        graph = self.graph
+        size = graph.size
+        if isinstance(graph, OverlapGraph):
+            stored = np.full((size, size), graph.background, dtype=np.float64)
+            indptr = np.asarray(graph.indptr, dtype=np.int64)
+            rows = np.repeat(np.arange(size), np.diff(indptr))
+            stored[rows, np.asarray(graph.indices)] = np.asarray(graph.pheromones)
+            for i, row in graph.extra.items():
+                for j, value in row.items():
+                    stored[i, j] = value
+        else:
+            stored = np.asarray(graph.pheromones, dtype=np.float64).reshape(size, size)
+        return np.maximum(stored * graph.scale, graph.low)
+
+    @staticmethod
+    def _sample(weights, generator):
+        """
+        batched inverse-CDF sampling - one node per row of weights
+
+        :param weights: matrix of non negative weights, every row has positive sum
+        :param generator: numpy random numbers generator
+        :return: chosen column of every row
+        """
+        cumulative = np.cumsum(weights, axis=1)
+        draws = generator.random(len(weights)) * cumulative[:, -1]
+        chosen = (cumulative <= draws[:, None]).sum(axis=1)
+        return np.minimum(chosen, weights.shape[1] - 1)
+
+    def run(self, firstAttempt: bool, seed: int = None):
+        """
+        run all ants until every ant covers sequence
+
+        :param firstAttempt: when true random choices are enabled
+        :param seed: seed of numpy random numbers generator
+        :return: list of (route, deposits) of every ant, same as Ant.run
+        """
+        generator = np.random.default_rng(seed)
+        raw = self._pheromones()
+        pheromones = raw
+        if self.candidates is not None:
+            pheromones = raw * (1.0 / self.weights) ** self.beta
+        ants = self.antCount
+        size = self.graph.size
+
+        current = np.full(ants, self.starter, dtype=np.int64)
+        cover = np.zeros(ants, dtype=np.int64)
+        used = np.zeros((ants, len(self._lows)), dtype=bool)
+        remaining = np.tile(self._counts, (ants, 1))
+        routes = [[self.starter] for _ in range(ants)]
+
+        active = np.arange(ants)
+        while len(active):
+            position = cover[active][:, None]
+            location = current[active]
+            isOpen = (self._lows <= position) & (self._highs >= position) & ~used[active]
+            eligible = np.add.reduceat(isOpen, self._starts, axis=1) > 0
+
+            row = np.ones((len(active), size)) if firstAttempt else pheromones[location]
+            weights = row * eligible
+            if self.candidates is not None:
+                preferred = weights * self.candidates[location]
+                hasPreferred = preferred.sum(axis=1) > 0
+                weights[hasPreferred] = preferred[hasPreferred]
+
+            valid = weights.sum(axis=1) > 0
+            if not valid.all():
+                # fallback - remaining nodes (all nodes when none remains) without using range
+                self.metrics.count("fallback", int((~valid).sum()))
+                left = remaining[active[~valid]] > 0
+                left[~left.any(axis=1)] = True
+                # like Ant fallback, remaining nodes are weighted by pheromone only
+                fallback = np.ones((len(left), size)) if firstAttempt else raw[location[~valid]]
+                weights[~valid] = fallback * left
+
+            chosen = self._sample(weights, generator)
+
+            consuming = np.nonzero(valid)[0]
+            if len(consuming):
+                ant = active[consuming]
+                node = chosen[consuming]
+                candidates = isOpen[consuming] & (self._occurrenceNodes == node[:, None])
+                occurrence = np.where(candidates, self._highs, np.iinfo(np.int64).max).argmin(axis=1)
+                used[ant, occurrence] = True
+                remaining[ant, node] -= 1
+
+            cover[active] += self.weights[location, chosen]
+            current[active] = chosen
+            for ant, node in zip(active.tolist(), chosen.tolist()):
+                routes[ant].append(node)
+            active = active[cover[active] < self.sequenceLength]
+
+        results = []
+        for route in routes:
+            deposits = {}
+            for edge in zip(route, route[1:]):
+                deposits[edge] = deposits.get(edge, 0) + self.alpha
+            results.append((array('i', route), deposits))
+        return results
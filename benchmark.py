@@ -0,0 +1,229 @@
+import argparse
+import itertools
+import json
+import sys
+import tracemalloc
+from time import perf_counter
+from generator import Generator
+from instance import Instance
+from scoring import myersDistance
+from utilities import generateGraph, generateWeightsMatrix, levenshteinDistance, loadAntColony, mergeRoute, \
+    mergeSolution
+
+# relative growth of time or peak memory reported as regression
+TOLERANCE = 0.2
+# smaller absolute growth of time (seconds) is treated as timer noise
+TIME_NOISE = 0.001
+
+
+def benchmarkAllocation(shared_state: bool, sequence_length: int = 500, oligo_size: int = 9, ant_count: int = 50,
+                        iterations: int = 3, seed: int = 0):
+    """
+    measure memory allocated while ants of one iteration are created and run
+
+    :param shared_state: ants share colony graph, spectrum and ranges instead of deep copies
+    :param sequence_length: length of DNA sequence
+    :param oligo_size: oligonucleotide size
+    :param ant_count: number of ants
+    :param iterations: number of measured iterations
+    :param seed: seed of instance and ants choices
+    :return: list of (peak allocated bytes, time) of every iteration
+    """
+    AntColony = loadAntColony()
+    colony = AntColony(ant_count=ant_count, sequence_length=sequence_length, oligo_size=oligo_size,
+                       shared_state=shared_state, seed=seed)
+    colony._initGenerator()
+    colony._initArea()
+    colony.first_attempt = False
+
+    results = []
+    for iteration in range(iterations):
+        tracemalloc.start()
+        start = perf_counter()
+        deposits = []
+        for ant in colony._init_ants():
+            _, ant_deposits = ant.run()
+            deposits.append(ant_deposits)
+        elapsed = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        colony._updatePheromonesMap(deposits)
+        results.append((peak, elapsed))
+    return results
+
+
+def _measure(function, repeat: int = 1):
+    """
+    time function (the best of repeat untraced runs) and measure its peak allocation in one more traced run
+
+    :param function: function without arguments
+    :param repeat: number of timed runs
+    :return: (time in seconds, peak allocated bytes, result of function)
+    """
+    elapsed = float("inf")
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        elapsed = min(elapsed, perf_counter() - start)
+    tracemalloc.start()
+    result = function()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, result
+
+
+def benchmarkCase(sequence_length: int, oligo_size: int, percent: float, ant_count: int, iterations: int = 10,
+                  seed: int = 0, engines: tuple = ("ant",), repeat: int = 3):
+    """
+    benchmark pipeline stages (functions called by colony) and whole runs on one instance generated from seed,
+    legacy functions replaced in pipeline are timed on the same input as "reference:" stages for comparison
+
+    :param sequence_length: length of DNA sequence
+    :param oligo_size: oligonucleotide size
+    :param percent: percent of extra range
+    :param ant_count: number of ants
+    :param iterations: number of iterations of mainloop runs
+    :param seed: seed of instance and colony
+    :param engines: engines of mainloop runs (see AntColony.ENGINES)
+    :param repeat: number of timed runs of every stage
+    :return: dictionary stage -> {"time", "peak"} and for mainloop runs also {"quality", "stop_reason"},
+    time of Ant.run is time of one ant
+    """
+    AntColony = loadAntColony()
+    generator = Generator(sequence_length, oligo_size, percent, seed=seed)
+    generator.generateSequence()
+    instance = Instance.fromGenerator(generator)
+    spectrum = list(instance.spectrum)
+    results = {}
+
+    def record(stage, function):
+        elapsed, peak, result = _measure(function, repeat)
+        results[stage] = {"time": elapsed, "peak": peak}
+        return result
+
+    colony = AntColony(ant_count=ant_count, iterations=iterations, percent=percent, seed=seed, instance=instance)
+    record("generateGraph", lambda: generateGraph(instance.spectrum, colony.dense_limit, colony.max_weight))
+    colony._initGenerator()
+    colony._initArea()
+    colony.first_attempt = False
+    runs = record("Ant.run", lambda: [ant.run() for ant in colony._init_ants()])
+    results["Ant.run"]["time"] /= ant_count
+    deposits = [ant_deposits for _, ant_deposits in runs]
+    record("_updatePheromonesMap", lambda: colony._updatePheromonesMap(deposits))
+
+    route = runs[0][0]
+    merged = record("mergeRoute", lambda: mergeRoute(route, colony.initial_solution, colony.graph))
+    record("myersDistance", lambda: myersDistance(merged, instance.sequence))
+
+    record("reference:generateWeightsMatrix", lambda: generateWeightsMatrix(len(spectrum), spectrum))
+    record("reference:mergeSolution", lambda: mergeSolution([spectrum[node] for node in route], oligo_size))
+    record("reference:levenshteinDistance", lambda: levenshteinDistance(merged, instance.sequence))
+
+    for engine in engines:
+        def run():
+            colony = AntColony(ant_count=ant_count, iterations=iterations, percent=percent, seed=seed,
+                               instance=instance, engine=engine)
+            colony.mainloop()
+            return colony
+        colony = record(f"mainloop[{engine}]", run)
+        results[f"mainloop[{engine}]"].update(quality=colony.best_result / 2, stop_reason=colony.stop_reason)
+    return results
+
+
+def benchmarkSuite(sequence_lengths: list, oligo_sizes: list, percents: list, ant_counts: list,
+                   iterations: int = 10, seed: int = 0, engines: tuple = ("ant",), repeat: int = 3):
+    """
+    run benchmarkCase on every point of grid, the same seed gives the same instances
+
+    :return: dictionary with configuration and results e.g. {"config": {..}, "results": {"n=200 k=5 ..": {..}}}
+    """
+    config = {"sequence_length": sequence_lengths, "oligo_size": oligo_sizes, "percent": percents,
+              "ant_count": ant_counts, "iterations": iterations, "seed": seed, "engines": list(engines)}
+    results = {}
+    for sequence_length, oligo_size, percent, ant_count in itertools.product(sequence_lengths, oligo_sizes,
+                                                                             percents, ant_counts):
+        key = f"n={sequence_length} k={oligo_size} percent={percent} ants={ant_count}"
+        results[key] = benchmarkCase(sequence_length, oligo_size, percent, ant_count, iterations, seed, engines,
+                                     repeat)
+    return {"config": config, "results": results}
+
+
+def findRegressions(report: dict, baseline: dict, tolerance: float = TOLERANCE):
+    """
+    compare report with baseline - time or peak memory bigger by more than tolerance and every worse
+    solution quality is regression, cases missing in baseline are skipped,
+    growth of time smaller than TIME_NOISE is ignored
+
+    :param report: result of benchmarkSuite
+    :param baseline: earlier result of benchmarkSuite
+    :param tolerance: allowed relative growth of time and peak memory
+    :return: list of regression descriptions
+    """
+    regressions = []
+    for key, stages in report["results"].items():
+        for stage, values in stages.items():
+            reference = baseline["results"].get(key, {}).get(stage)
+            if reference is None:
+                continue
+            for measure, noise in (("time", TIME_NOISE), ("peak", 0)):
+                if values[measure] > reference[measure] * (1 + tolerance) + noise:
+                    regressions.append(f"{key} {stage} {measure}: {reference[measure]:.6g} -> {values[measure]:.6g}")
+            if "quality" in values and values["quality"] > reference["quality"]:
+                regressions.append(f"{key} {stage} quality: {reference['quality']} -> {values['quality']}")
+    return regressions
+
+
+def _printReport(report: dict):
+    for key, stages in report["results"].items():
+        print(key)
+        for stage, values in stages.items():
+            quality = f"  quality {values['quality']}" if "quality" in values else ""
+            print(f"  {stage:>32}: time {values['time']:.6f}s  peak {values['peak'] / 1024:10.1f} KiB{quality}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="benchmarks of SBH with ranges")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    suite = commands.add_parser("suite", help="time, peak memory and quality over grid of instances")
+    suite.add_argument("--sequence-length", type=int, nargs="+", default=[200, 500])
+    suite.add_argument("--oligo-size", type=int, nargs="+", default=[5, 9])
+    suite.add_argument("--percent", type=float, nargs="+", default=[0.05])
+    suite.add_argument("--ant-count", type=int, nargs="+", default=[10])
+    suite.add_argument("--iterations", type=int, default=10)
+    suite.add_argument("--seed", type=int, default=0)
+    suite.add_argument("--engine", nargs="+", default=["ant"])
+    suite.add_argument("--repeat", type=int, default=3)
+    suite.add_argument("--save", help="write results as JSON baseline")
+    suite.add_argument("--baseline", help="JSON baseline to compare with, exit status is 1 on regression")
+    suite.add_argument("--tolerance", type=float, default=TOLERANCE)
+
+    allocation = commands.add_parser("allocation", help="per iteration allocation of shared state and copying ants")
+    allocation.add_argument("--sequence-length", type=int, default=500)
+    allocation.add_argument("--oligo-size", type=int, default=9)
+    allocation.add_argument("--ant-count", type=int, default=50)
+    allocation.add_argument("--iterations", type=int, default=3)
+    allocation.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.command == "allocation":
+        for shared_state in (False, True):
+            results = benchmarkAllocation(shared_state, args.sequence_length, args.oligo_size, args.ant_count,
+                                          args.iterations, args.seed)
+            mode = "shared" if shared_state else "copy"
+            for iteration, (peak, elapsed) in enumerate(results):
+                print(f"{mode:>6} iteration {iteration}: peak {peak / 1024:10.1f} KiB  time {elapsed:.3f}s")
+        sys.exit(0)
+
+    report = benchmarkSuite(args.sequence_length, args.oligo_size, args.percent, args.ant_count, args.iterations,
+                            args.seed, tuple(args.engine), args.repeat)
+    _printReport(report)
+    if args.save:
+        with open(args.save, "w") as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = findRegressions(report, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        sys.exit(1 if regressions else 0)
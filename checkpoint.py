@@ -0,0 +1,225 @@
+import json
+import os
+import queue
+import threading
+from array import array
+from hashlib import blake2b
+from time import perf_counter
+from instance import loadInstance, saveInstance
+
+HEADER = "checkpoint.json"
+INSTANCE = "instance.sbh"
+VERSION = 2
+
+# AntColony parameters stored as attributes of the same name
+_PARAMETERS = ("ant_count", "alpha", "evaporation_coefficient", "iterations", "sequence_length", "oligo_size",
+               "percent", "dense_limit", "max_weight", "shared_state", "candidate_count", "beta", "workers",
+               "deposit_policy", "pheromone_min", "pheromone_max", "engine", "stop_on_exact", "stagnation",
+               "min_branching", "branching_ratio", "time_limit", "local_search", "local_search_radius",
+               "checkpoint_interval", "branching_interval")
+
+
+def _atomicWrite(path: str, write):
+    """
+    write file by function write(file) to temporary file and rename it, so path holds old or new content only
+
+    :param path: file path
+    :param write: function receiving opened binary file
+    """
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        write(file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temporary, path)
+
+
+def instanceFingerprint(instance):
+    """
+    :param instance: Instance
+    :return: dictionary of sizes and hash of spectrum, starter and ranges - checkpoint is valid only
+    for instance with the same fingerprint
+    """
+    digest = blake2b(digest_size=16)
+    ranges = instance.ranges
+    for values in (instance.spectrum.codes, ranges.starts, ranges.lows, ranges.highs, ranges.nodes):
+        digest.update(memoryview(values).cast('B'))
+    digest.update(str(instance.starterNode).encode())
+    return {"dnaLength": instance.dnaLength, "oligoLength": instance.oligoLength,
+            "spectrum": len(instance.spectrum), "hash": digest.hexdigest()}
+
+
+def colonyState(colony):
+    """
+    snapshot of colony state taken between iterations - pheromones are copied, so colony can continue
+    while snapshot is written
+
+    :param colony: AntColony
+    :return: (header dictionary, copy of stored pheromones)
+    """
+    graph = colony.graph
+    config = {name: getattr(colony, name) for name in _PARAMETERS}
+    config.update(score_cache_size=colony.score_cache.size, metrics=colony.metrics.enabled)
+    version, state, gauss = colony.random.getstate()
+    header = {
+        "version": VERSION,
+        "config": config,
+        "iteration": colony.iteration,
+        "improved_at": colony.improved_at,
+        "first_attempt": colony.first_attempt,
+        "elapsed": perf_counter() - colony.started_at,
+        "best_result": colony.best_result,
+        "best_solution": colony.best_solution,
+        "best_deposits": [[i, j, amount] for (i, j), amount in (colony.best_deposits or {}).items()],
+        "has_best_deposits": colony.best_deposits is not None,
+        "random": [version, list(state), gauss],
+        "trail": {"scale": graph.scale, "low": graph.low, "high": graph.high,
+                  "background": getattr(graph, "background", None),
+                  "extra": [[i, j, value] for i, row in getattr(graph, "extra", {}).items()
+                            for j, value in row.items()]},
+        "pheromones": f"pheromones-{colony.iteration}.bin",
+        "length": len(graph.pheromones),
+        "instance": instanceFingerprint(colony.instance),
+    }
+    return header, array('f', graph.pheromones)
+
+
+def writeCheckpoint(directory: str, header: dict, pheromones: array, instance=None):
+    """
+    write checkpoint - pheromones go to new binary file, then header naming this file replaces old header,
+    so crash at any moment leaves the previous or the new checkpoint complete
+
+    :param directory: checkpoint directory
+    :param header: header from colonyState
+    :param pheromones: pheromones from colonyState
+    :param instance: Instance saved next to checkpoint (replaces instance of previous run in the same directory)
+    """
+    os.makedirs(directory, exist_ok=True)
+    instancePath = os.path.join(directory, INSTANCE)
+    if instance is not None and not (instance.path is not None and os.path.exists(instancePath)
+                                     and os.path.samefile(instance.path, instancePath)):
+        # replaced, not overwritten - resumed colony may still map previous file
+        saveInstance(instance, instancePath + ".tmp")
+        os.replace(instancePath + ".tmp", instancePath)
+
+    headerPath = os.path.join(directory, HEADER)
+    previous = None
+    if os.path.exists(headerPath):
+        with open(headerPath) as file:
+            previous = json.load(file)["pheromones"]
+
+    _atomicWrite(os.path.join(directory, header["pheromones"]), pheromones.tofile)
+    _atomicWrite(headerPath, lambda file: file.write(json.dumps(header).encode()))
+    if previous is not None and previous != header["pheromones"]:
+        os.remove(os.path.join(directory, previous))
+
+
+def readCheckpoint(directory: str):
+    """
+    :param directory: checkpoint directory
+    :return: (header, pheromones, instance)
+    """
+    with open(os.path.join(directory, HEADER)) as file:
+        header = json.load(file)
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported checkpoint version {header['version']}")
+    instance = loadInstance(os.path.join(directory, INSTANCE))
+    if instanceFingerprint(instance) != header["instance"]:
+        raise ValueError(f"instance in {directory} is not the instance of checkpoint")
+    pheromones = array('f')
+    with open(os.path.join(directory, header["pheromones"]), "rb") as file:
+        pheromones.fromfile(file, header["length"])
+    return header, pheromones, instance
+
+
+def restoreColony(colony, header: dict, pheromones: array):
+    """
+    bring started colony (graph and engines are ready) to checkpointed state, graph object is kept,
+    so engines holding it see restored pheromones
+
+    :param colony: AntColony after start
+    :param header: header from readCheckpoint
+    :param pheromones: pheromones from readCheckpoint
+    """
+    graph = colony.graph
+    if len(pheromones) != len(graph.pheromones):
+        raise ValueError(f"checkpoint holds {len(pheromones)} pheromones, graph of colony has "
+                         f"{len(graph.pheromones)}")
+    trail = header["trail"]
+    graph.pheromones = pheromones
+    graph.scale = trail["scale"]
+    graph.setBounds(trail["low"], trail["high"])
+    if trail["background"] is not None:
+        graph.background = trail["background"]
+        graph.extra = {}
+        for i, j, value in trail["extra"]:
+            graph.extra.setdefault(i, {})[j] = value
+
+    version, state, gauss = header["random"]
+    colony.random.setstate((version, tuple(state), gauss))
+    colony.iteration = header["iteration"]
+    colony.improved_at = header["improved_at"]
+    colony.first_attempt = header["first_attempt"]
+    colony.best_result = header["best_result"]
+    colony.best_solution = header["best_solution"]
+    colony.best_deposits = {(i, j): amount for i, j, amount in header["best_deposits"]} \
+        if header["has_best_deposits"] else None
+    # time limit counts time of run before checkpoint
+    colony.started_at = perf_counter() - header["elapsed"]
+
+
+class CheckpointWriter:
+    """
+    Class writes checkpoints on separate thread, so iterations do not wait for disk
+
+    Snapshot of colony is taken on calling thread (see colonyState), writer thread only writes files.
+    Error of writer thread is raised by next submit or by close.
+
+    ___ATTRIBUTES___
+    self.directory - checkpoint directory
+    self._instanceSaved - flag indicating if instance of this run was already queued for writing
+    self._queue - snapshots waiting for writing
+    self._thread - writer thread
+    self._error - exception of writer thread
+
+     ___METHODS___
+    submit(self, colony) - snapshot colony and write it in background
+    close(self) - write waiting snapshots and stop thread
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self._instanceSaved = False
+        self._queue = queue.Queue()
+        self._error = None
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+    def _write(self):
+        while True:
+            job = self._queue.get()
+            if job is None:
+                return
+            try:
+                writeCheckpoint(self.directory, *job)
+            except Exception as error:
+                self._error = error
+
+    def _raise(self):
+        if self._error is not None:
+            error, self._error = self._error, None
+            raise error
+
+    def submit(self, colony):
+        self._raise()
+        header, pheromones = colonyState(colony)
+        if colony.graph is not None and colony.instance.graphKind is None:
+            colony.instance.cacheGraph(colony.graph)
+        # instance is written with first checkpoint of run, so directory reused by other run gets its instance
+        self._queue.put((header, pheromones, None if self._instanceSaved else colony.instance))
+        self._instanceSaved = True
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+        self._raise()
@@ -0,0 +1,240 @@
+from bisect import bisect_left, bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from random import Random
+from encoding import EncodedSpectrum
+from generator import Generator
+from instance import Instance, loadInstance
+from ranges import RangeIndex
+from scoring import myersDistance
+from utilities import loadAntColony
+
+
+def windowStarts(dnaLength: int, window: int, overlap: int):
+    """
+    :param dnaLength: DNA sequence length
+    :param window: length of window
+    :param overlap: length of overlap of neighbouring windows
+    :return: list of (start, end) of windows covering whole sequence, last window ends at dnaLength
+    """
+    if overlap >= window:
+        raise ValueError("overlap has to be shorter than window")
+    windows = []
+    start = 0
+    while start + window < dnaLength:
+        windows.append((start, start + window))
+        start += window - overlap
+    windows.append((start, dnaLength))
+    return windows
+
+
+def _windowStarter(instance: Instance, start: int, end: int, occurrences):
+    """
+    choose starting oligonucleotide of window from overlap with previous window - occurrence which middle
+    of range is the closest to window start, narrower range and single occurrence are preferred
+
+    :param instance: whole instance
+    :param start: window start
+    :param end: end of previous window
+    :param occurrences: occurrences numbers which can intersect window
+    :return: (node, estimated position) or None when no occurrence lies in overlap
+    """
+    ranges = instance.ranges
+    best = None
+    for occurrence in occurrences:
+        low = ranges.lows[occurrence]
+        high = ranges.highs[occurrence]
+        middle = (low + high) // 2
+        if not start <= middle < end:
+            continue
+        node = ranges.nodes[occurrence]
+        key = (abs(middle - start), high - low, ranges.count(node))
+        if best is None or key < best[0]:
+            best = (key, node, middle)
+    return None if best is None else (best[1], best[2])
+
+
+def windowInstance(instance: Instance, start: int, end: int, starterNode: int, occurrences=None):
+    """
+    build instance of window - oligonucleotides which ranges intersect window, ranges are cut to window
+    and moved so window starts at position 0
+
+    :param instance: whole instance
+    :param start: window start
+    :param end: window end
+    :param starterNode: node (of whole instance) starting window
+    :param occurrences: occurrences numbers which can intersect window, every occurrence when not given
+    :return: Instance of window
+    """
+    ranges = instance.ranges
+    if occurrences is None:
+        occurrences = range(len(ranges.lows))
+    perNode = {starterNode: []}
+    for occurrence in occurrences:
+        low = ranges.lows[occurrence]
+        high = ranges.highs[occurrence]
+        if low <= end and high >= start:
+            flat = perNode.setdefault(ranges.nodes[occurrence], [])
+            flat.append(max(low, start) - start)
+            flat.append(min(high, end) - start)
+
+    # nodes keep order of whole (shuffled) spectrum
+    oligoDict = {instance.spectrum[node]: perNode[node] or [0, 0] for node in sorted(perNode)}
+    oligos = list(oligoDict)
+    spectrum = EncodedSpectrum(oligos)
+    translation = {oligo: node for node, oligo in enumerate(oligos)}
+    return Instance(end - start, instance.oligoLength, instance.sequence[start:end], spectrum,
+                    translation[instance.spectrum[starterNode]], RangeIndex(oligoDict, translation))
+
+
+def stitchSegments(segments: list, oligoLength: int, tolerance: int):
+    """
+    join solutions of windows - every segment starts with its starting oligonucleotide, so it is placed at
+    occurrence of this oligonucleotide in already joined sequence which is the closest to expected position,
+    when there is no such occurrence segment is placed at expected position
+
+    :param segments: list of (start, solution) ordered by start
+    :param oligoLength: oligonucleotide length
+    :param tolerance: largest accepted distance between occurrence and expected position
+    :return: DNA sequence
+    """
+    origin, sequence = segments[0]
+    for start, segment in segments[1:]:
+        expected = min(start - origin, len(sequence))
+        head = segment[:oligoLength]
+        position = None
+        found = sequence.find(head, max(expected - tolerance, 0))
+        while found != -1 and found <= expected + tolerance:
+            if position is None or abs(found - expected) < abs(position - expected):
+                position = found
+            found = sequence.find(head, found + 1)
+        if position is None:
+            position = expected
+        sequence = sequence[:position] + segment
+    return sequence
+
+
+def _solveWindow(instance: Instance, parameters: dict):
+    """
+    :param instance: instance of window
+    :param parameters: AntColony parameters
+    :return: (solution, Levenshtein distance of solution and window sequence, reason of stop)
+    """
+    colony = loadAntColony()(instance=instance, **parameters)
+    solution, reason = colony.mainloop()
+    return solution, colony.best_result, reason
+
+
+class Decomposition:
+    """
+    Class solves long sequence as overlapping windows - every window is solved by its own colony
+
+    Ranges tell roughly where every oligonucleotide belongs, so oligonucleotide is given only to windows
+    which its ranges intersect. Window (except the first one) starts with oligonucleotide taken from overlap
+    with previous window (see _windowStarter), windows do not depend on each other and can be solved in parallel.
+    Solutions of windows are joined by placing every segment at occurrence of its starting oligonucleotide
+    in previous segments (see stitchSegments). Size of every colony depends only on window length,
+    so cost grows linearly with DNA length.
+
+    ___ATTRIBUTES___
+    self.window - length of window
+    self.overlap - length of overlap of neighbouring windows
+    self.window_workers - number of processes solving windows
+    self.parameters - AntColony parameters of every window
+    self.instance_source - instance file path, Instance or None to generate instance
+    self.instance - solved instance
+    self.windows - list of (start, end) of windows
+    self.segments - list of (start, solution, best_result, stop_reason) of every window
+    self.best_result - Levenshtein distance of joined solution and sequence
+    self.best_solution - joined solution
+
+     ___METHODS___
+    _initInstance(self) - generate or load instance
+    _prepareWindows(self) - windows and their instances
+    mainloop(self) - solve windows and join solutions, returns joined solution
+    """
+
+    def __init__(self, window: int = 1000, overlap: int = 100, window_workers: int = 1, seed=None, instance=None,
+                 **parameters):
+        """
+        :param window: length of window
+        :param overlap: length of overlap of neighbouring windows
+        :param window_workers: number of processes solving windows
+        :param seed: seed of generated instance and of colonies
+        :param instance: instance file path or Instance, generated when None
+        :param parameters: AntColony parameters common for all windows (sequence_length, oligo_size and percent
+        are used to generate instance)
+        """
+        self.window = window
+        self.overlap = overlap
+        self.window_workers = window_workers
+        self.random = Random(seed)
+        self.parameters = parameters
+        self.instance_source = instance
+        self.instance = None
+        self.windows = None
+        self.segments = None
+        self.best_result = 10000000000000
+        self.best_solution = None
+
+    def _initInstance(self):
+        if isinstance(self.instance_source, str):
+            self.instance = loadInstance(self.instance_source)
+        elif self.instance_source is not None:
+            self.instance = self.instance_source
+        else:
+            generator = Generator(self.parameters.get("sequence_length", 500), self.parameters.get("oligo_size", 9),
+                                  self.parameters.get("percent", 0.05), seed=self.random.getrandbits(64))
+            generator.generateSequence()
+            self.instance = Instance.fromGenerator(generator)
+
+    def _prepareWindows(self):
+        """
+        :return: list of window instances, self.windows holds their (start, end)
+        """
+        ranges = self.instance.ranges
+        lows = [ranges.lows[occurrence] for occurrence in ranges.order]
+        width = max((high - low for low, high in zip(ranges.lows, ranges.highs)), default=0)
+
+        def occurrences(start, end):
+            # occurrences sorted by lower range, only ones with lower range in [start - width, end] can intersect
+            return ranges.order[bisect_left(lows, start - width):bisect_right(lows, end)]
+
+        self.windows = []
+        instances = []
+        previousEnd = None
+        for start, end in windowStarts(self.instance.dnaLength, self.window, self.overlap):
+            starter = self.instance.starterNode
+            if previousEnd is not None:
+                chosen = _windowStarter(self.instance, start, previousEnd, occurrences(start, previousEnd))
+                if chosen is not None:
+                    # window starts at estimated position of its starting oligonucleotide
+                    starter, start = chosen
+            self.windows.append((start, end))
+            instances.append(windowInstance(self.instance, start, end, starter, occurrences(start, end)))
+            previousEnd = end
+        return instances
+
+    def mainloop(self):
+        self._initInstance()
+        instances = self._prepareWindows()
+        parameters = [dict(self.parameters, seed=self.random.getrandbits(64)) for _ in instances]
+        if self.window_workers > 1:
+            with ProcessPoolExecutor(self.window_workers) as executor:
+                results = list(executor.map(_solveWindow, instances, parameters))
+        else:
+            results = [_solveWindow(instance, window) for instance, window in zip(instances, parameters)]
+
+        self.segments = [(start, solution, result, reason)
+                         for (start, _), (solution, result, reason) in zip(self.windows, results)]
+        self.best_solution = stitchSegments([(start, solution) for start, solution, _, _ in self.segments],
+                                            self.instance.oligoLength, self.overlap)
+        self.best_result = myersDistance(self.best_solution, self.instance.sequence)
+        return self.best_solution
+
+
+if __name__ == "__main__":
+    decomposition = Decomposition(window=400, overlap=60, sequence_length=2000, oligo_size=9, ant_count=10,
+                                  iterations=20, seed=1)
+    best = decomposition.mainloop()
+    print(best)
+    print(decomposition.best_result / 2, [result / 2 for _, _, result, _ in decomposition.segments])
@@ -0,0 +1,155 @@
+from array import array
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+BASES = "ACGT"
+_CODES = {base: code for code, base in enumerate(BASES)}
+
+
+def encodeOligo(oligo: str):
+    """
+    pack oligonucleotide into integer, 2 bits per base, first base in the highest bits
+
+    :param oligo: oligonucleotide e.g. "ACT"
+    :return: code e.g. 0b000111
+    """
+    code = 0
+    for base in oligo:
+        try:
+            code = (code << 2) | _CODES[base]
+        except KeyError:
+            raise ValueError(f"invalid base {base} in {oligo}") from None
+    return code
+
+
+def decodeOligo(code: int, length: int):
+    """
+    :param code: packed oligonucleotide
+    :param length: oligonucleotide length
+    :return: oligonucleotide
+    """
+    bases = []
+    for shift in range(2 * (length - 1), -1, -2):
+        bases.append(BASES[(code >> shift) & 3])
+    return ''.join(bases)
+
+
+class EncodedSpectrum:
+    """
+    Class holds spectrum as packed oligonucleotides, node number is position in spectrum
+
+    Strings are decoded only on demand (indexing, iteration) e.g. for output and scoring.
+
+    ___ATTRIBUTES___
+    self.oligoLength - oligonucleotide length
+    self.codes - packed oligonucleotides (array of unsigned 64 bit integers or memoryview of them)
+    self.nodes - dictionary code -> node number, built on first use
+
+     ___METHODS___
+    node(self, oligo) - node number of oligonucleotide
+    copy(self) - copy of spectrum held in own array
+    """
+
+    def __init__(self, oligonucleotides: list):
+        """
+        :param oligonucleotides: spectrum - list of oligonucleotides of equal length (at most 32 bases)
+        """
+        self.oligoLength = len(oligonucleotides[0]) if oligonucleotides else 0
+        if self.oligoLength > 32:
+            raise ValueError("oligonucleotides longer than 32 bases can not be packed")
+        for oligo in oligonucleotides:
+            if len(oligo) != self.oligoLength:
+                raise ValueError(f"oligonucleotide {oligo} is not {self.oligoLength} bases long like the first one")
+        self.codes = array('Q', [encodeOligo(oligo) for oligo in oligonucleotides])
+        self._nodes = None
+
+    @classmethod
+    def fromCodes(cls, codes, length: int):
+        """
+        :param codes: packed oligonucleotides (array or memoryview), they are not copied
+        :param length: oligonucleotide length
+        :return: EncodedSpectrum
+        """
+        spectrum = cls.__new__(cls)
+        spectrum.oligoLength = length
+        spectrum.codes = codes
+        spectrum._nodes = None
+        return spectrum
+
+    @property
+    def nodes(self):
+        if self._nodes is None:
+            self._nodes = {code: node for node, code in enumerate(self.codes)}
+        return self._nodes
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, node: int):
+        return decodeOligo(self.codes[node], self.oligoLength)
+
+    def __iter__(self):
+        for code in self.codes:
+            yield decodeOligo(code, self.oligoLength)
+
+    def node(self, oligo: str):
+        return self.nodes[encodeOligo(oligo)]
+
+    def copy(self):
+        return EncodedSpectrum.fromCodes(array('Q', self.codes), self.oligoLength)
+
+
+def rollingCodes(chunks, length: int):
+    """
+    slide window of given length over sequence and pack every k-mer, window is moved by shift and mask,
+    so sequence can be given in chunks and is never needed as a whole
+
+    :param chunks: iterable of sequence parts e.g. ["ACGT", "TTA"]
+    :param length: oligonucleotide length
+    :return: generator of (position, code) of every k-mer
+    """
+    if np is not None:
+        yield from _vectorCodes(chunks, length)
+        return
+
+    mask = (1 << 2 * length) - 1
+    code = 0
+    seen = 0
+    for chunk in chunks:
+        for base in chunk:
+            try:
+                code = ((code << 2) | _CODES[base]) & mask
+            except KeyError:
+                raise ValueError(f"invalid base {base}") from None
+            seen += 1
+            if seen >= length:
+                yield seen - length, code
+
+
+def _vectorCodes(chunks, length: int):
+    """
+    rollingCodes with NumPy - bases of chunk are translated by lookup table and codes of all k-mers
+    of chunk are built by length shifted array operations, last length - 1 bases are carried to next chunk
+    """
+    lookup = np.full(256, 4, dtype=np.uint64)
+    for base, code in _CODES.items():
+        lookup[ord(base)] = code
+    carried = np.zeros(0, dtype=np.uint64)
+    seen = 0
+    for chunk in chunks:
+        values = lookup[np.frombuffer(chunk.encode("ascii", "replace"), dtype=np.uint8)]
+        invalid = np.flatnonzero(values == 4)
+        if len(invalid):
+            raise ValueError(f"invalid base {chunk[invalid[0]]}")
+        window = np.concatenate((carried, values))
+        count = len(window) - length + 1
+        if count > 0:
+            codes = np.zeros(count, dtype=np.uint64)
+            for offset in range(length):
+                codes = (codes << 2) | window[offset:offset + count]
+            yield from zip(range(seen - len(carried), seen - len(carried) + count), codes.tolist())
+        seen += len(chunk)
+        carried = window[max(len(window) - length + 1, 0):]
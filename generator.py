@@ -1,4 +1,13 @@
-from random import randint, shuffle, choices
+from random import Random
+from encoding import BASES, EncodedSpectrum, decodeOligo, rollingCodes
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# byte of every base code, used to turn NumPy drawn codes into sequence
+_BASE_BYTES = np.frombuffer(BASES.encode("ascii"), dtype=np.uint8) if np is not None else None
 
 
 class Generator:
@@ -15,17 +24,24 @@ class Generator:
     self._alphabet - holds nitrogenous bases: A - adenine, C - cytosine, G - guanine, T- thymine
     self.sequence - DNA generated sequence
     self.positive - generating positive mistakes
+    self.negative - fraction of oligonucleotides dropped from spectrum (negative mistakes)
+    self._random - random numbers generator, seeded when seed is given
+    self._numpy - NumPy random numbers generator seeded from self._random drawing bases in bulk,
+    None without NumPy (the same seed gives the same instance only with the same NumPy availability)
 
      ___METHODS___
     generateSequence(self) - generate DNA sequence
+    streamOligonucleotides(self, chunkSize, keepSequence) - generate sequence in chunks and yield oligonucleotides
     _getOligonucleotides(self) - create oligonucleotides from sequence
     getSpectrum(self) - returns spectrum (shuffled oligonucleotides)
+    getEncodedSpectrum(self) - returns spectrum as 2-bit packed oligonucleotides (EncodedSpectrum)
     _getRange(self, position) - return range in which oligonucleotide is stored
     _addToDict - add oligonucleotides(ranges) to dictionary
+    _addRange - add oligonucleotide range to dictionary
     _generatePositive(self) - generate positive instances (not existing oligonucleotides)
     """
 
-    def __init__(self, n: int, k: int, percent: float, positive=False):
+    def __init__(self, n: int, k: int, percent: float, positive=False, seed=None, negative: float = 0.0):
         """
         generator initialization
 
@@ -33,6 +49,9 @@ class Generator:
         :param k: oligonucleotide length
         :param percent: percent of extra range to basic position
         :param positive: flag decides whether generate positive mistakes
+        :param seed: seed of random numbers generator - the same seed gives the same instance
+        :param negative: fraction of oligonucleotides dropped from spectrum (negative mistakes),
+        starter is never dropped
         """
 
         self.dnaLength = n
@@ -43,29 +62,64 @@ class Generator:
         self._alphabet = ['A', 'C', 'G', 'T']
         self.sequence = ''
         self.positive = positive
+        self.negative = negative
+        self._random = Random(seed)
+        self._numpy = np.random.default_rng(self._random.getrandbits(64)) if np is not None else None
 
     def generateSequence(self):
         """
-        generate sequence by adding random alphabet elements
+        generate sequence by drawing alphabet elements in bulk
         """
 
-        for i in range(self.dnaLength):
-            self.sequence += self._alphabet[randint(0, 3)]
         self._getOligonucleotides()
 
+    def _drawBases(self, count: int):
+        if self._numpy is not None:
+            return _BASE_BYTES[self._numpy.integers(0, 4, count)].tobytes().decode("ascii")
+        return ''.join(self._random.choices(self._alphabet, k=count))
+
+    def streamOligonucleotides(self, chunkSize: int = 65536, keepSequence: bool = True):
+        """
+        generate sequence chunk by chunk and yield its oligonucleotides with ranges,
+        oligonucleotides are packed by rolling 2-bit window (see encoding.rollingCodes)
+        first oligonucleotide is saved as starter, dropped oligonucleotides (negative mistakes) are not yielded
+
+        :param chunkSize: number of bases drawn at once
+        :param keepSequence: when true whole sequence is saved in self.sequence after stream ends
+        :return: generator of (code, position, low, high)
+        """
+        parts = []
+
+        def chunks():
+            remaining = self.dnaLength
+            while remaining > 0:
+                chunk = self._drawBases(min(chunkSize, remaining))
+                remaining -= len(chunk)
+                if keepSequence:
+                    parts.append(chunk)
+                yield chunk
+
+        for position, code in rollingCodes(chunks(), self.oligoLength):
+            if position == 0:
+                self.starter = decodeOligo(code, self.oligoLength)
+            elif self.negative and self._random.random() < self.negative:
+                continue
+            low, high = self._getRange(position)
+            yield code, position, low, high
+
+        if keepSequence:
+            self.sequence = ''.join(parts)
+
     def _getOligonucleotides(self):
         """
-        create oligonucleotides from sequence
+        create oligonucleotides from generated sequence
         saves first oligonucleotide as starter
 
         :parameter oligo: oligonucleotide is k-length substring of DNA sequence
         """
 
-        for i in range(self.dnaLength - self.oligoLength + 1):
-            oligo = self.sequence[i:self.oligoLength + i]
-            if i == 0:
-                self.starter = oligo
-            self._addToDict(oligo, i)
+        for code, position, low, high in self.streamOligonucleotides():
+            self._addRange(decodeOligo(code, self.oligoLength), low, high)
 
         if self.positive:
             self._generatePositive()
@@ -78,15 +132,21 @@ class Generator:
         :param oligo: oligonucleotide
         :param position: oligonucleotide exact position in DNA sequence
         """
+        low, high = self._getRange(position)
+        self._addRange(oligo, low, high)
+
+    def _addRange(self, oligo, low, high):
+        """
+        append lower and upper range of oligonucleotide to its flat list
+
+        :param oligo: oligonucleotide
+        :param low: lower range
+        :param high: upper range
+        """
         if oligo not in self.oligoDict:
             self.oligoDict[oligo] = []
-            low, high = self._getRange(position)
-            self.oligoDict[oligo].append(low)
-            self.oligoDict[oligo].append(high)
-        else:
-            low, high = self._getRange(position)
-            self.oligoDict[oligo].append(low)
-            self.oligoDict[oligo].append(high)
+        self.oligoDict[oligo].append(low)
+        self.oligoDict[oligo].append(high)
 
     def getSpectrum(self):
         """
@@ -97,9 +157,17 @@ class Generator:
         #
 
         spectrum = list(self.oligoDict.keys())
-        shuffle(spectrum)
+        self._random.shuffle(spectrum)
         return spectrum
 
+    def getEncodedSpectrum(self):
+        """
+        shuffle oligonucleotides and pack them 2 bits per base
+
+        :return: EncodedSpectrum - node number is position in shuffled spectrum
+        """
+        return EncodedSpectrum(self.getSpectrum())
+
     def _getRange(self, position):
         """
         generate range in which oligonucleotide should be placed during reconstruction
@@ -107,10 +175,10 @@ class Generator:
         :param position: exact position of nucleotide in DNA sequence
         :return: range in which oligonucleotide should be placed during reconstruction
         """
-        lowerRange = position - randint(0, int(self.dnaLength * self.percent))
+        lowerRange = position - self._random.randint(0, int(self.dnaLength * self.percent))
         if lowerRange < 0:
             lowerRange = 0
-        upperRange = position + randint(0, int(self.dnaLength * self.percent))
+        upperRange = position + self._random.randint(0, int(self.dnaLength * self.percent))
         if upperRange > self.dnaLength:
             upperRange = self.dnaLength
         oligoRange = [lowerRange, upperRange]
@@ -123,10 +191,8 @@ class Generator:
         """
         iterations = int(self.dnaLength * 0.1)
         for iteration in range(iterations):
-            oligonucleotide = ''
-            for base in range(self.oligoLength):
-                oligonucleotide += self._alphabet[randint(0, 3)]
-            self._addToDict(oligonucleotide, randint(0, self.dnaLength))
+            oligonucleotide = self._drawBases(self.oligoLength)
+            self._addToDict(oligonucleotide, self._random.randint(0, self.dnaLength))
 
     # TODO remove __main__ statement after class validation and verification
 
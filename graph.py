@@ -0,0 +1,346 @@
+from array import array
+from bisect import bisect_left
+from overlap import OverlapIndex
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class PheromoneTrail:
+    """
+    Base class of graphs - keeps pheromones as stored values and one common scale
+
+    Real pheromone is max(stored * scale, low). Evaporation only changes scale, so its cost does not depend on
+    number of edges, deposit changes only visited edges and cuts pheromone to high (MMAS-style bounds).
+    Vectorized evaporation would still touch every stored value - for 500 nodes one NumPy pass over dense
+    pheromones costs hundreds of times more than changing scale, so scale is kept whether NumPy is installed
+    or not. NumPy (optional, as in batch.py) is used only to apply deposits of dense graph in one pass.
+
+    ___ATTRIBUTES___
+    self.scale - common multiplier of stored pheromones
+    self.low - lower pheromone bound
+    self.high - upper pheromone bound
+
+     ___METHODS___
+    setBounds(self, low, high) - set pheromone bounds
+    evaporate(self, coefficient) - multiply every pheromone by (1 - coefficient)
+    depositAll(self, deposits) - apply deposits of ant e.g. {(0, 1): 24}
+    branchingFactor(self, ratio) - average lambda-branching factor of nodes (convergence measure)
+    """
+
+    def _initTrail(self):
+        self.scale = 1.0
+        self.low = 0.0
+        self.high = float("inf")
+
+    def _read(self, stored: float):
+        return max(stored * self.scale, self.low)
+
+    def _added(self, stored: float, amount: float):
+        """
+        :return: stored value of pheromone increased by amount and cut to upper bound
+        """
+        return min(max(stored * self.scale, self.low) + amount, self.high) / self.scale
+
+    def setBounds(self, low: float, high: float):
+        self.low = low
+        self.high = high
+
+    def evaporate(self, coefficient: float):
+        self.scale *= 1 - coefficient
+        if self.scale < 1e-20:
+            self._renormalize()
+
+    def _renormalize(self):
+        """
+        move scale into stored values, used only when scale becomes too small for float32 values
+        """
+        self.pheromones = array('f', [max(stored * self.scale, self.low) for stored in self.pheromones])
+        self.scale = 1.0
+
+    def depositAll(self, deposits: dict):
+        for (i, j), amount in deposits.items():
+            self.deposit(i, j, amount)
+
+    def _branches(self, stored, ratio: float, hidden: int = 0, background: float = 0.0):
+        """
+        count pheromones of row which are not smaller than min + ratio * (max - min) of row,
+        comparisons are done on stored values, so row is never converted to real pheromones
+
+        :param stored: stored pheromones of row
+        :param ratio: lambda of branching factor e.g. 0.05
+        :param hidden: number of other pairs of row, all of them hold background
+        :param background: stored pheromone of hidden pairs
+        :return: number of branches of row or None when all pheromones of row are equal (row never visited)
+        """
+        extremes = [min(stored), max(stored)] if len(stored) else []
+        if hidden:
+            extremes.append(background)
+        if not extremes:
+            return None
+        lowest = self._read(min(extremes))
+        highest = self._read(max(extremes))
+        if highest - lowest <= highest * 1e-6:
+            # float32 rounding of stored values is not a difference
+            return None
+        threshold = lowest + ratio * (highest - lowest)
+        if threshold <= self.low:
+            return len(stored) + hidden
+        bound = threshold / self.scale
+        count = sum(map(bound.__le__, stored))
+        return count + hidden if background >= bound else count
+
+    def branchingFactor(self, ratio: float = 0.05):
+        """
+        average lambda-branching factor - mean number of successors whose pheromone is not smaller than
+        min + ratio * (max - min) of node's pheromones, it drops towards 1 when colony converges
+        nodes whose pheromones are all equal (never left by ant) are skipped
+
+        :param ratio: lambda e.g. 0.05
+        :return: average branching factor, size of graph when no node was left by ant
+        """
+        total = 0
+        rows = 0
+        for i in range(self.size):
+            branches = self._rowBranches(i, ratio)
+            if branches is not None:
+                total += branches
+                rows += 1
+        return total / rows if rows else float(self.size)
+
+
+class OverlapGraph(PheromoneTrail):
+    """
+    Class holds overlap graph of spectrum in compressed sparse row (CSR) form together with pheromones
+
+    Only edges with weight smaller than oligonucleotide length (real overlap) are stored, every other pair
+    has weight equal to oligonucleotide length. Pheromones are stored as float32 on stored edges,
+    pheromone of every other pair is equal to self.background unless ant left trace on it (self.extra).
+
+    ___ATTRIBUTES___
+    self.size - number of nodes (spectrum size)
+    self.oligoLength - oligonucleotide length, weight of pair without overlap
+    self.indptr - edges of i-th node are stored on positions indptr[i] .. indptr[i + 1] - 1
+    self.indices - sorted target node of every edge
+    self.weights - weight of every edge
+    self.pheromones - pheromone of every edge (float32)
+    self.background - pheromone of pairs which are not stored as edges
+    self.extra - pheromones of not stored pairs visited by ants e.g. {3: {17: 12.1}}
+    pheromones, background and extra are stored values - see PheromoneTrail
+    pairs of extra which evaporated to background (closer than PRUNE_LEVEL) are dropped by evaporate,
+    so extra holds only recently visited pairs instead of growing with every iteration
+
+     ___METHODS___
+    _edge(self, i, j) - position of edge i -> j or -1
+    weight(self, i, j) - weight between nodes
+    pheromone(self, i, j) - pheromone between nodes
+    successors(self, i) - list of (node, weight) of stored edges of node i
+    deposit(self, i, j, amount) - increase pheromone between nodes
+    evaporate(self, coefficient) - evaporate pheromones and drop evaporated pairs of extra
+    copy(self) - copy of graph, structure arrays are shared
+    """
+
+    # largest difference of real pheromones of pair and background for which pair is dropped from extra
+    PRUNE_LEVEL = 1e-4
+
+    def __init__(self, size: int, oligoLength: int, indptr: array, indices: array, weights: array,
+                 pheromones: array, background: float):
+        """
+        graph initialization
+
+        :param size: number of nodes
+        :param oligoLength: oligonucleotide length
+        :param indptr: row pointers (size + 1 elements)
+        :param indices: target nodes, sorted inside every row
+        :param weights: weights of edges
+        :param pheromones: pheromones of edges
+        :param background: pheromone of pairs which are not stored as edges
+        """
+
+        self.size = size
+        self.oligoLength = oligoLength
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.pheromones = pheromones
+        self.background = background
+        self.extra = {}
+        self._initTrail()
+
+    @classmethod
+    def fromIndex(cls, index: OverlapIndex, pheromone: float = 0.1):
+        """
+        build graph from overlap index
+
+        :param index: overlap index of spectrum
+        :param pheromone: initial pheromone value
+        :return: overlap graph
+        """
+        pheromones = array('f', [pheromone]) * len(index.indices)
+        return cls(index.size, index.oligoLength, index.indptr, index.indices, index.weights, pheromones, pheromone)
+
+    def _edge(self, i: int, j: int):
+        start = self.indptr[i]
+        end = self.indptr[i + 1]
+        position = bisect_left(self.indices, j, start, end)
+        if position < end and self.indices[position] == j:
+            return position
+        return -1
+
+    def weight(self, i: int, j: int):
+        position = self._edge(i, j)
+        if position < 0:
+            return self.oligoLength
+        return self.weights[position]
+
+    def pheromone(self, i: int, j: int):
+        position = self._edge(i, j)
+        if position < 0:
+            return self._read(self.extra.get(i, {}).get(j, self.background))
+        return self._read(self.pheromones[position])
+
+    def successors(self, i: int):
+        return [(self.indices[position], self.weights[position])
+                for position in range(self.indptr[i], self.indptr[i + 1])]
+
+    def deposit(self, i: int, j: int, amount: float):
+        position = self._edge(i, j)
+        if position < 0:
+            row = self.extra.setdefault(i, {})
+            row[j] = self._added(row.get(j, self.background), amount)
+        else:
+            self.pheromones[position] = self._added(self.pheromones[position], amount)
+
+    def evaporate(self, coefficient: float):
+        super().evaporate(coefficient)
+        bound = (self._read(self.background) + self.PRUNE_LEVEL) / self.scale
+        for i in [i for i, row in self.extra.items() if min(row.values()) <= bound]:
+            row = {j: stored for j, stored in self.extra[i].items() if stored > bound}
+            if row:
+                self.extra[i] = row
+            else:
+                del self.extra[i]
+
+    def _rowBranches(self, i: int, ratio: float):
+        start = self.indptr[i]
+        end = self.indptr[i + 1]
+        row = self.extra.get(i, {})
+        stored = self.pheromones[start:end].tolist() + list(row.values())
+        return self._branches(stored, ratio, self.size - (end - start) - len(row), self.background)
+
+    def _renormalize(self):
+        for row in self.extra.values():
+            for j in row:
+                row[j] = self._read(row[j])
+        self.background = self._read(self.background)
+        super()._renormalize()
+
+    def copy(self):
+        graph = OverlapGraph(self.size, self.oligoLength, self.indptr, self.indices, self.weights,
+                             array('f', self.pheromones), self.background)
+        graph.extra = {i: dict(row) for i, row in self.extra.items()}
+        graph.scale = self.scale
+        graph.setBounds(self.low, self.high)
+        return graph
+
+
+class DenseGraph(PheromoneTrail):
+    """
+    Dense fallback of OverlapGraph for small instances - weights and pheromones of every pair are stored
+    in flat row-major arrays, interface is the same as OverlapGraph
+
+    ___ATTRIBUTES___
+    self.size - number of nodes (spectrum size)
+    self.oligoLength - oligonucleotide length
+    self.weights - weights of every pair, weight of i -> j is stored at i * size + j
+    self.pheromones - stored pheromones of every pair (float32) - see PheromoneTrail
+    """
+
+    # smallest number of deposits applied with NumPy, smaller deposits are cheaper in plain loop
+    VECTOR_DEPOSITS = 16
+
+    def __init__(self, size: int, oligoLength: int, weights: array, pheromones: array):
+        self.size = size
+        self.oligoLength = oligoLength
+        self.weights = weights
+        self.pheromones = pheromones
+        self._initTrail()
+
+    @classmethod
+    def fromIndex(cls, index: OverlapIndex, pheromone: float = 0.1):
+        size = index.size
+        weights = array('b', [index.oligoLength]) * (size * size)
+        for i, j, weight in index.pairs():
+            weights[i * size + j] = weight
+        pheromones = array('f', [pheromone]) * (size * size)
+        return cls(size, index.oligoLength, weights, pheromones)
+
+    def weight(self, i: int, j: int):
+        return self.weights[i * self.size + j]
+
+    def pheromone(self, i: int, j: int):
+        return self._read(self.pheromones[i * self.size + j])
+
+    def successors(self, i: int):
+        row = self.weights[i * self.size:(i + 1) * self.size]
+        return [(j, weight) for j, weight in enumerate(row) if weight < self.oligoLength]
+
+    def _rowBranches(self, i: int, ratio: float):
+        return self._branches(self.pheromones[i * self.size:(i + 1) * self.size], ratio)
+
+    def deposit(self, i: int, j: int, amount: float):
+        position = i * self.size + j
+        self.pheromones[position] = self._added(self.pheromones[position], amount)
+
+    def depositAll(self, deposits: dict):
+        """
+        apply deposits of ant, with NumPy all visited edges are updated by one gather and one scatter
+        (edges of deposits are unique), values are computed in float64 like _added, so they do not depend
+        on NumPy being installed
+        """
+        if np is None or len(deposits) < self.VECTOR_DEPOSITS:
+            return super().depositAll(deposits)
+        pheromones = np.frombuffer(self.pheromones, dtype=np.float32)
+        positions = np.fromiter((i * self.size + j for i, j in deposits), dtype=np.int64, count=len(deposits))
+        amounts = np.fromiter(deposits.values(), dtype=np.float64, count=len(deposits))
+        stored = pheromones[positions].astype(np.float64)
+        pheromones[positions] = np.minimum(np.maximum(stored * self.scale, self.low) + amounts,
+                                           self.high) / self.scale
+
+    def copy(self):
+        graph = DenseGraph(self.size, self.oligoLength, self.weights, array('f', self.pheromones))
+        graph.scale = self.scale
+        graph.setBounds(self.low, self.high)
+        return graph
+
+
+def buildGraph(spectrum: list, pheromone: float = 0.1, denseLimit: int = 2000, maxWeight: int = None):
+    """
+    build graph shared by ants and colony, dense graph is used for small spectrum
+
+    :param spectrum: list of oligonucleotides
+    :param pheromone: initial pheromone value
+    :param denseLimit: biggest spectrum size for which dense graph is built
+    :param maxWeight: biggest weight stored in sparse graph, by default every overlap is stored (graph is exact,
+    but random spectrum has O(|S|^2) overlapping pairs), smaller value bounds memory to about |S|^2 * 4^-(k - maxWeight)
+    edges at the price of exactness - pairs with bigger weight are treated as not overlapping (weight k), which
+    changes sequence_cover steps of ants, candidate lists and merged sequences
+    :return: OverlapGraph or DenseGraph
+    """
+    if len(spectrum) <= denseLimit:
+        return DenseGraph.fromIndex(OverlapIndex(spectrum), pheromone)
+    return OverlapGraph.fromIndex(OverlapIndex(spectrum, maxWeight), pheromone)
+
+
+def candidateLists(graph, count: int):
+    """
+    precompute for every node its best successors - the ones with the biggest overlap (the smallest weight)
+
+    :param graph: OverlapGraph or DenseGraph
+    :param count: length of every candidate list
+    :return: list of candidate lists e.g. [[4, 17, 2], [0, 9, 11] ..]
+    """
+    return [[node for weight, node in sorted((weight, node) for node, weight in graph.successors(i))[:count]]
+            for i in range(graph.size)]
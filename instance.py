@@ -0,0 +1,236 @@
+import json
+import mmap
+import os
+import struct
+from array import array
+from encoding import EncodedSpectrum, encodeOligo
+from graph import OverlapGraph, DenseGraph
+from ranges import RangeIndex
+
+MAGIC = b"SBHR"
+VERSION = 1
+_ALIGNMENT = 8
+
+
+class Instance:
+    """
+    Class holds SBH with ranges instance - reference sequence, spectrum, ranges and optional overlap graph
+
+    Instance can be saved in compact binary file and loaded back with memory mapping - arrays of loaded
+    instance are memoryviews of mapped file, so nothing is copied and many processes can share one file.
+
+    File layout: magic "SBHR", version (uint32), header length (uint32), JSON header, then arrays aligned
+    to 8 bytes. Header holds sizes, starter node and list of sections [name, typecode, offset, length],
+    offsets are counted from first aligned position after header.
+
+    ___ATTRIBUTES___
+    self.dnaLength - DNA sequence length
+    self.oligoLength - oligonucleotide length
+    self.sequence - reference DNA sequence (empty when unknown)
+    self.spectrum - EncodedSpectrum
+    self.starterNode - node number of first oligonucleotide
+    self.ranges - RangeIndex
+    self.graphKind - "sparse", "dense" or None when graph is not cached
+    self.graphArrays - dictionary of cached graph arrays (indptr, indices, weights)
+    self.path - file of memory mapped instance, None for instance built in memory
+
+     ___METHODS___
+    fromGenerator(generator) - build instance from generated sequence
+    starter - first oligonucleotide
+    oligoDict - ranges in Generator.oligoDict form
+    getEncodedSpectrum(self) - spectrum
+    cacheGraph(self, graph) - keep graph structure to save it with instance
+    graph(self, pheromone) - graph built from cached arrays or None
+    """
+
+    def __init__(self, dnaLength: int, oligoLength: int, sequence: str, spectrum: EncodedSpectrum, starterNode: int,
+                 ranges: RangeIndex):
+        self.dnaLength = dnaLength
+        self.oligoLength = oligoLength
+        self.sequence = sequence
+        self.spectrum = spectrum
+        self.starterNode = starterNode
+        self.ranges = ranges
+        self.graphKind = None
+        self.graphArrays = None
+        self.path = None
+        self._mmap = None
+
+    @classmethod
+    def fromGenerator(cls, generator):
+        """
+        :param generator: Generator after generateSequence()
+        :return: Instance with shuffled spectrum
+        """
+        spectrum = generator.getEncodedSpectrum()
+        translation = {oligo: spectrum.node(oligo) for oligo in generator.oligoDict}
+        return cls(generator.dnaLength, generator.oligoLength, generator.sequence, spectrum,
+                   spectrum.node(generator.starter), RangeIndex(generator.oligoDict, translation))
+
+    @property
+    def starter(self):
+        return self.spectrum[self.starterNode]
+
+    @property
+    def oligoDict(self):
+        oligoDict = {}
+        for node in range(len(self.spectrum)):
+            flat = []
+            for occurrence in range(self.ranges.starts[node], self.ranges.starts[node + 1]):
+                flat.append(self.ranges.lows[occurrence])
+                flat.append(self.ranges.highs[occurrence])
+            oligoDict[self.spectrum[node]] = flat
+        return oligoDict
+
+    def getEncodedSpectrum(self):
+        return self.spectrum
+
+    def cacheGraph(self, graph):
+        """
+        :param graph: OverlapGraph or DenseGraph built for this instance
+        """
+        if isinstance(graph, OverlapGraph):
+            self.graphKind = "sparse"
+            self.graphArrays = {"indptr": graph.indptr, "indices": graph.indices, "weights": graph.weights}
+        else:
+            self.graphKind = "dense"
+            self.graphArrays = {"weights": graph.weights}
+
+    def graph(self, pheromone: float = 0.1):
+        """
+        :param pheromone: initial pheromone value
+        :return: graph sharing cached structure arrays with fresh pheromones or None when graph is not cached
+        """
+        size = len(self.spectrum)
+        if self.graphKind == "sparse":
+            pheromones = array('f', [pheromone]) * len(self.graphArrays["indices"])
+            return OverlapGraph(size, self.oligoLength, self.graphArrays["indptr"], self.graphArrays["indices"],
+                                self.graphArrays["weights"], pheromones, pheromone)
+        if self.graphKind == "dense":
+            return DenseGraph(size, self.oligoLength, self.graphArrays["weights"],
+                              array('f', [pheromone]) * (size * size))
+        return None
+
+
+def _typecode(values):
+    return values.format if isinstance(values, memoryview) else values.typecode
+
+
+def _dataStart(headerLength: int):
+    """
+    :param headerLength: length of JSON header
+    :return: position of first array - arrays start after header at aligned position
+    """
+    return -(-(len(MAGIC) + 8 + headerLength) // _ALIGNMENT) * _ALIGNMENT
+
+
+def saveInstance(instance: Instance, path: str):
+    """
+    write instance to binary file, file is written to temporary file and renamed
+
+    :param instance: instance to save
+    :param path: file path
+    """
+    sections = {
+        "sequence": array('B', instance.sequence.encode("ascii")),
+        "codes": instance.spectrum.codes,
+        "starts": instance.ranges.starts,
+        "lows": instance.ranges.lows,
+        "highs": instance.ranges.highs,
+        "nodes": instance.ranges.nodes,
+        "order": instance.ranges.order,
+    }
+    if instance.graphArrays is not None:
+        for name, values in instance.graphArrays.items():
+            sections["graph_" + name] = values
+
+    header = {"dnaLength": instance.dnaLength, "oligoLength": instance.oligoLength,
+              "starterNode": instance.starterNode, "graphKind": instance.graphKind, "sections": []}
+    offset = 0
+    for name, values in sections.items():
+        header["sections"].append([name, _typecode(values), offset, len(values)])
+        offset += -(-len(values) * memoryview(values).itemsize // _ALIGNMENT) * _ALIGNMENT
+    encoded = json.dumps(header).encode()
+    start = _dataStart(len(encoded))
+
+    temporary = path + ".tmp"
+    with open(temporary, "wb") as file:
+        file.write(MAGIC)
+        file.write(struct.pack("<II", VERSION, len(encoded)))
+        file.write(encoded)
+        for (name, typecode, position, length), values in zip(header["sections"], sections.values()):
+            file.write(b"\0" * (start + position - file.tell()))
+            file.write(memoryview(values).cast('B'))
+    os.replace(temporary, path)
+
+
+def loadInstance(path: str):
+    """
+    map binary instance file into memory, arrays of returned instance are views of mapped file
+
+    :param path: file path
+    :return: Instance
+    """
+    with open(path, "rb") as file:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    if mapped[:len(MAGIC)] != MAGIC:
+        raise ValueError(f"{path} is not SBH instance file")
+    version, length = struct.unpack_from("<II", mapped, len(MAGIC))
+    if version != VERSION:
+        raise ValueError(f"unsupported instance file version {version}")
+    header = json.loads(bytes(mapped[len(MAGIC) + 8:len(MAGIC) + 8 + length]))
+
+    buffer = memoryview(mapped)
+    start = _dataStart(length)
+    sections = {}
+    for name, typecode, offset, count in header["sections"]:
+        size = count * array(typecode).itemsize
+        sections[name] = buffer[start + offset:start + offset + size].cast(typecode)
+
+    spectrum = EncodedSpectrum.fromCodes(sections["codes"], header["oligoLength"])
+    ranges = RangeIndex.fromArrays(sections["starts"], sections["lows"], sections["highs"], sections["nodes"],
+                                   sections["order"])
+    instance = Instance(header["dnaLength"], header["oligoLength"], bytes(sections["sequence"]).decode("ascii"),
+                        spectrum, header["starterNode"], ranges)
+    if header["graphKind"] is not None:
+        instance.graphKind = header["graphKind"]
+        instance.graphArrays = {name[len("graph_"):]: values for name, values in sections.items()
+                                if name.startswith("graph_")}
+    instance.path = path
+    instance._mmap = mapped
+    return instance
+
+
+def importSpectrum(path: str, dnaLength: int, sequence: str = "", starter: str = None):
+    """
+    read spectrum from text file line by line
+    every line holds oligonucleotide and optionally flat list of its ranges e.g. "ACGT 0 12 40 55",
+    oligonucleotide without ranges can be placed anywhere, empty lines and lines starting with # are skipped
+
+    :param path: text file path
+    :param dnaLength: DNA sequence length
+    :param sequence: reference sequence if known
+    :param starter: first oligonucleotide, by default first oligonucleotide of file
+    :return: Instance
+    """
+    oligoDict = {}
+    with open(path) as file:
+        for line in file:
+            fields = line.split()
+            if not fields or fields[0].startswith("#"):
+                continue
+            oligo = fields[0].upper()
+            encodeOligo(oligo)
+            ranges = [int(value) for value in fields[1:]] or [0, dnaLength]
+            if len(ranges) % 2:
+                raise ValueError(f"odd number of range values for {oligo}")
+            if starter is None:
+                starter = oligo
+            oligoDict.setdefault(oligo, []).extend(ranges)
+
+    spectrum = EncodedSpectrum(list(oligoDict))
+    translation = {oligo: node for node, oligo in enumerate(oligoDict)}
+    if starter.upper() not in translation:
+        raise ValueError(f"starter {starter} is not in spectrum of {path}")
+    return Instance(dnaLength, spectrum.oligoLength, sequence, spectrum, translation[starter.upper()],
+                    RangeIndex(oligoDict, translation))
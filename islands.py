@@ -0,0 +1,211 @@
+import os
+import queue
+import shutil
+import tempfile
+import traceback
+from multiprocessing import Process, Queue
+from random import Random
+from generator import Generator
+from instance import Instance, saveInstance
+from metrics import JsonLinesSink
+from utilities import generateGraph, loadAntColony
+
+
+def _runIsland(index: int, parameters: dict, path: str, iterations: int, interval: int, reports, inbox):
+    """
+    island process - run colony on memory mapped instance, every interval iterations send best solution
+    to runner and wait for migrant (best solution of all islands or None when own solution is the best)
+
+    :param index: island number
+    :param parameters: AntColony parameters
+    :param path: instance file
+    :param iterations: number of iterations
+    :param interval: number of iterations between migrations
+    :param reports: queue of (index, iteration, best_result, best_solution, best_deposits)
+    :param inbox: queue of migrants of this island
+    """
+    try:
+        colony = loadAntColony()(instance=path, iterations=iterations, **parameters)
+        colony.start()
+        try:
+            for iteration in range(1, iterations + 1):
+                colony.step()
+                if iteration % interval and iteration != iterations:
+                    continue
+                reports.put((index, iteration, colony.best_result, colony.best_solution, colony.best_deposits))
+                if iteration != iterations:
+                    migrant = inbox.get()
+                    if migrant is not None:
+                        colony.migrate(*migrant)
+        finally:
+            colony.close()
+    except Exception:
+        reports.put((index, None, traceback.format_exc(), None, None))
+
+
+class IslandModel:
+    """
+    Class runs several colonies (islands) on the same instance in separate processes
+
+    Islands differ by seed and optionally by parameters. Every migration_interval iterations all islands
+    report their best solutions, best solution of all islands migrates to other islands - its route is deposited
+    on their pheromones and it becomes their best solution (see AntColony.migrate).
+    Instance is saved once to binary file and memory mapped by every island (see instance.py).
+
+    ___ATTRIBUTES___
+    self.islands - list of AntColony parameters of every island
+    self.iterations - number of iterations of every island
+    self.migration_interval - number of iterations between migrations
+    self.instance_source - instance file path, Instance or None to generate instance
+    self.best_result - the best Levenshtein distance of all islands
+    self.best_solution - the best solution of all islands
+    self.best_island - island which found the best solution
+    self.progress - best result of every island after every migration e.g. {0: [(10, 42), (20, 30)]}
+    self.hooks - callables receiving event after every migration (see addHook)
+
+     ___METHODS___
+    _prepareInstance(self, directory) - instance file solved by islands
+    _receive(self, reports, processes, waiting) - next report, raises when waited island died
+    addHook(self, hook) - add callable receiving migration events
+    mainloop(self) - run islands, returns the best solution
+    """
+
+    # seconds of waiting for report between checks of island processes
+    REPORT_TIMEOUT = 1.0
+
+    def __init__(self, islands=4, iterations: int = 80, migration_interval: int = 10, seed=None, instance=None,
+                 **parameters):
+        """
+        :param islands: number of islands or list of parameters of every island (e.g. [{"alpha": 8}, {"beta": 2}])
+        :param iterations: number of iterations of every island
+        :param migration_interval: number of iterations between migrations
+        :param seed: seed of islands seeds and generated instance
+        :param instance: instance file path or Instance, generated when None
+        :param parameters: AntColony parameters common for all islands
+        """
+        if isinstance(islands, int):
+            islands = [{} for _ in range(islands)]
+        if not islands:
+            raise ValueError("at least one island is required")
+        if migration_interval < 1:
+            raise ValueError("migration interval must be positive")
+        self.random = Random(seed)
+        self.islands = []
+        for island in islands:
+            island = {**parameters, **island}
+            island.setdefault("seed", self.random.getrandbits(64))
+            self.islands.append(island)
+        self.parameters = parameters
+        self.iterations = iterations
+        self.migration_interval = migration_interval
+        self.instance_source = instance
+        self.best_result = 10000000000000
+        self.best_solution = None
+        self.best_island = None
+        self.progress = {index: [] for index in range(len(self.islands))}
+        self.hooks = []
+
+    def addHook(self, hook):
+        """
+        :param hook: callable receiving event dictionary after every migration, e.g. {"event": "migration",
+        "iteration": 10, "best_result": 40, "best_island": 2, "islands": [44, 52, 40, 47]} - see metrics.JsonLinesSink
+        """
+        self.hooks.append(hook)
+
+    def _prepareInstance(self, directory: str):
+        """
+        :param directory: directory for generated instance file
+        :return: path of instance file
+        """
+        if isinstance(self.instance_source, str):
+            return self.instance_source
+        instance = self.instance_source
+        if instance is None:
+            generator = Generator(self.parameters.get("sequence_length", 500), self.parameters.get("oligo_size", 9),
+                                  self.parameters.get("percent", 0.05), seed=self.random.getrandbits(64))
+            generator.generateSequence()
+            instance = Instance.fromGenerator(generator)
+        if instance.graphKind is None:
+            # graph is built once and mapped by islands with instance
+            instance.cacheGraph(generateGraph(instance.spectrum, self.parameters.get("dense_limit", 2000),
+                                              self.parameters.get("max_weight")))
+        path = os.path.join(directory, "instance.sbh")
+        saveInstance(instance, path)
+        return path
+
+    def _receive(self, reports, processes: list, waiting: list):
+        """
+        wait for next report, island killed before reporting (e.g. by out of memory killer) can not report
+        its failure, so processes of waited islands are checked between waits
+
+        :param reports: queue of reports
+        :param processes: process of every island
+        :param waiting: islands whose reports are awaited
+        :return: report
+        """
+        dead = None
+        while True:
+            try:
+                return reports.get(timeout=self.REPORT_TIMEOUT)
+            except queue.Empty:
+                if dead is not None:
+                    # report sent just before exit had one more timeout to arrive
+                    raise RuntimeError(f"island {dead} died with exit code {processes[dead].exitcode}") from None
+                dead = next((index for index in waiting if processes[index].exitcode is not None), None)
+
+    def mainloop(self):
+        directory = tempfile.mkdtemp(prefix="islands")
+        reports = Queue()
+        inboxes = [Queue() for _ in self.islands]
+        processes = []
+        completed = False
+        try:
+            path = self._prepareInstance(directory)
+            for index, parameters in enumerate(self.islands):
+                process = Process(target=_runIsland, args=(index, parameters, path, self.iterations,
+                                                           self.migration_interval, reports, inboxes[index]))
+                process.start()
+                processes.append(process)
+
+            migrations = sorted(set(range(self.migration_interval, self.iterations, self.migration_interval))
+                                | {self.iterations})
+            for iteration in migrations:
+                received = {}
+                while len(received) < len(self.islands):
+                    waiting = [index for index in range(len(self.islands)) if index not in received]
+                    index, reported, result, solution, deposits = self._receive(reports, processes, waiting)
+                    if reported is None:
+                        raise RuntimeError(f"island {index} failed:\n{result}")
+                    received[index] = (result, solution, deposits)
+                    self.progress[index].append((iteration, result))
+
+                best = min(received, key=lambda island: received[island][0])
+                if received[best][0] < self.best_result:
+                    self.best_result, self.best_solution, _ = received[best]
+                    self.best_island = best
+                for hook in self.hooks:
+                    hook({"event": "migration", "iteration": iteration, "best_result": self.best_result,
+                          "best_island": self.best_island,
+                          "islands": [received[index][0] for index in range(len(self.islands))]})
+
+                if iteration != self.iterations:
+                    for index, inbox in enumerate(inboxes):
+                        inbox.put(received[best] if received[index][0] > received[best][0] else None)
+            completed = True
+        finally:
+            for process in processes:
+                if not completed:
+                    # islands may wait for migrants which will never come
+                    process.terminate()
+                process.join()
+            shutil.rmtree(directory, ignore_errors=True)
+        return self.best_solution
+
+
+if __name__ == "__main__":
+    model = IslandModel(islands=4, iterations=20, migration_interval=5, ant_count=10, sequence_length=200,
+                        oligo_size=5, seed=1)
+    model.addHook(JsonLinesSink())
+    best = model.mainloop()
+    print(best)
+    print(model.best_result / 2, model.best_island)
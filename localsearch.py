@@ -0,0 +1,170 @@
+from array import array
+
+
+class LocalSearch:
+    """
+    Class improves ant route with swap, relocate and or-opt moves
+
+    Route is judged by (range violations, total weight) compared lexicographically - the smaller total weight
+    the bigger overlap of the same oligonucleotides. Change of total weight caused by move is computed from
+    few removed and added edges (O(1)), ranges are checked (O(route length)) only for moves which decrease
+    total weight and only from first changed position. Move is applied when it does not increase number
+    of violations. Moves are tried only within radius positions, first node (starter) never moves.
+
+    ___ATTRIBUTES___
+    self.graph - overlap graph (OverlapGraph or DenseGraph)
+    self.ranges - RangeIndex
+    self.radius - largest distance (in route positions) of moved node
+    self.segments - lengths of moved segments: 1 - relocate, 2 and more - or-opt
+    self.moves - largest number of applied moves
+
+     ___METHODS___
+    violations(self, route) - number of nodes placed outside all of their ranges
+    improve(self, route) - improved route and number of applied moves
+    """
+
+    def __init__(self, graph, ranges, radius: int = 10, segments: tuple = (1, 2, 3), moves: int = 100):
+        self.graph = graph
+        self.ranges = ranges
+        self.radius = radius
+        self.segments = segments
+        self.moves = moves
+
+    def _edges(self, route: list, edges: list):
+        """
+        :param route: route as list of nodes
+        :param edges: list of (i, j) positions in route, pairs reaching past route end are skipped
+        :return: total weight of edges
+        """
+        weight = self.graph.weight
+        last = len(route)
+        return sum(weight(route[i], route[j]) for i, j in edges if j < last)
+
+    def violations(self, route: list):
+        """
+        node is checked like in Ant - at sequence_cover from which it was chosen, i.e. position of previous node
+        (sum of weights before previous node), starter is not checked
+
+        :param route: route as list of nodes
+        :return: number of nodes whose previous node's position is outside all of their ranges
+        """
+        return self._profile(route)[1][-1]
+
+    def _profile(self, route: list):
+        """
+        :param route: route as list of nodes
+        :return: (position of every node, number of violations before every node and of whole route)
+        """
+        weight = self.graph.weight
+        positions = [0]
+        counts = [0, 0]
+        for t in range(1, len(route)):
+            cover = positions[-1]
+            counts.append(counts[-1] + (not self.ranges.openOccurrences(route[t], cover)))
+            positions.append(cover + weight(route[t - 1], route[t]))
+        return positions, counts[:len(route) + 1]
+
+    def _violationsFrom(self, moved: list, start: int, positions: list, counts: list, limit: int):
+        """
+        count violations of moved route which is equal to profiled route before position start,
+        counting stops as soon as number of violations exceeds limit
+
+        :return: number of violations or limit + 1
+        """
+        weight = self.graph.weight
+        count = counts[start]
+        cover = positions[start - 1]
+        for t in range(start, len(moved)):
+            if not self.ranges.openOccurrences(moved[t], cover):
+                count += 1
+                if count > limit:
+                    return limit + 1
+            cover += weight(moved[t - 1], moved[t])
+        return count
+
+    def _swapDelta(self, route: list, i: int, j: int):
+        """
+        change of total weight when nodes on positions i < j - 1 are swapped
+        """
+        removed = self._edges(route, [(i - 1, i), (i, i + 1), (j - 1, j), (j, j + 1)])
+        weight = self.graph.weight
+        added = weight(route[i - 1], route[j]) + weight(route[j], route[i + 1]) + weight(route[j - 1], route[i])
+        if j + 1 < len(route):
+            added += weight(route[i], route[j + 1])
+        return added - removed
+
+    def _moveDelta(self, route: list, i: int, length: int, j: int):
+        """
+        change of total weight when segment route[i:i + length] is moved behind node on position j
+        (j < i - 1 or j >= i + length)
+        """
+        end = i + length - 1
+        removed = self._edges(route, [(i - 1, i), (end, end + 1), (j, j + 1)])
+        weight = self.graph.weight
+        added = weight(route[j], route[i])
+        if end + 1 < len(route):
+            added += weight(route[i - 1], route[end + 1])
+        if j + 1 < len(route):
+            added += weight(route[end], route[j + 1])
+        return added - removed
+
+    @staticmethod
+    def _swapped(route: list, i: int, j: int):
+        moved = list(route)
+        moved[i], moved[j] = moved[j], moved[i]
+        return moved
+
+    @staticmethod
+    def _moved(route: list, i: int, length: int, j: int):
+        segment = route[i:i + length]
+        rest = route[:i] + route[i + length:]
+        position = j + 1 if j < i else j + 1 - length
+        return rest[:position] + segment + rest[position:]
+
+    def _candidates(self, route: list, i: int):
+        """
+        :return: generator of (weight change, first changed position, function building moved route) of moves
+        of node on position i (swaps with following nodes, relocation and or-opt of segments starting at i)
+        within radius
+        """
+        last = len(route)
+        for j in range(i + 2, min(i + self.radius, last - 1) + 1):
+            yield self._swapDelta(route, i, j), i, lambda j=j: self._swapped(route, i, j)
+        for length in self.segments:
+            if i + length > last:
+                break
+            for j in range(max(i - self.radius, 0), min(i + length - 1 + self.radius, last - 1) + 1):
+                if i - 1 <= j < i + length:
+                    continue
+                yield (self._moveDelta(route, i, length, j), min(i, j + 1),
+                       lambda length=length, j=j: self._moved(route, i, length, j))
+
+    def improve(self, route):
+        """
+        first improvement descent - apply first move which decreases total weight without increasing number
+        of violations, after move scan continues radius positions before moved node, descent ends when no
+        move improves route or moves limit is reached
+
+        :param route: route as node numbers (array or list), starter is on position 0
+        :return: (improved route as array of integers, number of applied moves)
+        """
+        route = list(route)
+        positions, counts = self._profile(route)
+        violations = counts[-1]
+        applied = 0
+        i = 1
+        while i < len(route) and applied < self.moves:
+            for delta, start, build in self._candidates(route, i):
+                if delta >= 0:
+                    continue
+                moved = build()
+                if self._violationsFrom(moved, start, positions, counts, violations) <= violations:
+                    route = moved
+                    positions, counts = self._profile(route)
+                    violations = counts[-1]
+                    applied += 1
+                    i = max(i - self.radius, 1)
+                    break
+            else:
+                i += 1
+        return array('i', route), applied
@@ -0,0 +1,124 @@
+import json
+import sys
+from contextlib import nullcontext
+from time import perf_counter
+
+
+class _Timer:
+    """
+    context manager adding elapsed wall time to timer of Metrics
+    """
+
+    def __init__(self, timers: dict, name: str):
+        self.timers = timers
+        self.name = name
+        self.start = None
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exception):
+        self.timers[self.name] = self.timers.get(self.name, 0.0) + perf_counter() - self.start
+        return False
+
+
+class Metrics:
+    """
+    Class collects per-phase wall time, counters and observed values of colony and ants
+
+    ___ATTRIBUTES___
+    self.enabled - flag indicating if metrics are collected
+    self.timers - total wall time of every phase in seconds e.g. {"ants": 1.2, "scoring": 0.4}
+    self.counters - counters e.g. {"fallback": 17}
+    self.observed - [count, total, min, max] of every observed value e.g. {"route_length": [50, 2100, 38, 47]}
+
+     ___METHODS___
+    timer(self, name) - context manager measuring phase
+    count(self, name, value) - increase counter
+    observe(self, name, value) - add value to statistics of name
+    snapshot(self) - JSON serializable state of metrics
+    """
+
+    enabled = True
+
+    def __init__(self):
+        self.timers = {}
+        self.counters = {}
+        self.observed = {}
+
+    def timer(self, name: str):
+        return _Timer(self.timers, name)
+
+    def count(self, name: str, value: int = 1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, value: float):
+        statistics = self.observed.get(name)
+        if statistics is None:
+            self.observed[name] = [1, value, value, value]
+            return
+        statistics[0] += 1
+        statistics[1] += value
+        if value < statistics[2]:
+            statistics[2] = value
+        if value > statistics[3]:
+            statistics[3] = value
+
+    def snapshot(self):
+        """
+        :return: dictionary of timers, counters and observed values (count, mean, min, max)
+        """
+        observed = {name: {"count": count, "mean": total / count, "min": low, "max": high}
+                    for name, (count, total, low, high) in self.observed.items()}
+        return {"timers": dict(self.timers), "counters": dict(self.counters), "observed": observed}
+
+
+class NullMetrics:
+    """
+    Disabled metrics - every method does nothing, so instrumented code costs one method call
+    """
+
+    enabled = False
+    _timer = nullcontext()
+
+    def timer(self, name: str):
+        return self._timer
+
+    def count(self, name: str, value: int = 1):
+        pass
+
+    def observe(self, name: str, value: float):
+        pass
+
+    def snapshot(self):
+        return {}
+
+
+class JsonLinesSink:
+    """
+    Hook writing every event as one JSON line e.g. {"event": "iteration", "iteration": 3, "best_result": 40}
+
+    ___ATTRIBUTES___
+    self.stream - output stream, standard output by default
+    self._owned - flag indicating if stream was opened by sink
+
+     ___METHODS___
+    close(self) - close file opened by sink
+    """
+
+    def __init__(self, stream=None, path: str = None):
+        """
+        :param stream: output stream
+        :param path: file to which events are appended, used instead of stream
+        """
+        self._owned = path is not None
+        self.stream = open(path, "a") if path is not None else stream or sys.stdout
+
+    def __call__(self, event: dict):
+        self.stream.write(json.dumps(event) + "\n")
+        self.stream.flush()
+
+    def close(self):
+        if self._owned:
+            self.stream.close()
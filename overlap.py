@@ -0,0 +1,181 @@
+from array import array
+from bisect import bisect_left
+from encoding import EncodedSpectrum
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+class OverlapIndex:
+    """
+    Class computes suffix -> prefix overlaps for every pair of spectrum oligonucleotides in bulk
+
+    Instead of comparing every pair of oligonucleotides slice by slice (customDistance), oligonucleotides
+    are bucketed by their prefixes for every shift. Suffix of each oligonucleotide is looked up in bucket
+    of prefixes of the same length, so no character comparisons are made for pairs which do not overlap.
+    Prefixes and suffixes are taken from 2-bit packed oligonucleotides with shifts and masks.
+    With NumPy buckets are sorted prefix arrays and suffixes of block of rows are looked up by searchsorted,
+    pairs found for several shifts are reduced to the smallest shift by np.unique - see _buildVector.
+
+    Pairs are stored in compressed sparse row arrays (the same form as OverlapGraph uses), not in dictionaries.
+    Cost is O(maxWeight * |S|) for bucketing plus the number of visited bucket members. For big shifts
+    prefixes are short and buckets are big (prefix of length 1 is shared by about |S| / 4 oligonucleotides),
+    so with default maxWeight = k - 1 build is still O(|S|^2) in time and index holds O(|S|^2) pairs.
+    Lower maxWeight bounds both - for random spectrum about |S|^2 * 4^-(k - maxWeight) pairs are stored.
+
+    ___ATTRIBUTES___
+    self.spectrum - EncodedSpectrum
+    self.size - number of oligonucleotides
+    self.oligoLength - oligonucleotide length
+    self.maxWeight - biggest weight (shift) stored in index, pairs with bigger weight are treated as not overlapping
+    self.indptr - pairs of i-th oligonucleotide are stored on positions indptr[i] .. indptr[i + 1] - 1
+    self.indices - sorted second oligonucleotide of every pair
+    self.weights - shift at which suffix of first oligonucleotide is equal to prefix of second one
+
+     ___METHODS___
+    _build(self) - fill arrays using prefix buckets
+    _buildVector(self) - fill arrays using sorted prefixes (NumPy)
+    weight(self, i, j) - weight between i-th and j-th oligonucleotide, same as customDistance
+    pairs(self) - iterate over (i, j, weight) for pairs which overlap
+    toMatrix(self, size) - dense matrix compatible with generateWeightsMatrix
+    """
+
+    # number of rows whose pairs are searched together by _buildVector, bounds its temporary arrays
+    BLOCK = 1024
+
+    def __init__(self, spectrum: list, maxWeight: int = None):
+        """
+        index initialization
+
+        :param spectrum: list of oligonucleotides of equal length or EncodedSpectrum
+        :param maxWeight: biggest stored weight, by default every overlapping pair is stored (weight < k)
+        """
+
+        if not isinstance(spectrum, EncodedSpectrum):
+            spectrum = EncodedSpectrum(spectrum)
+        self.spectrum = spectrum
+        self.size = len(spectrum)
+        self.oligoLength = spectrum.oligoLength
+        self.maxWeight = self.oligoLength - 1 if maxWeight is None else min(maxWeight, self.oligoLength - 1)
+        self.indptr = array('q', [0])
+        self.indices = array('i')
+        self.weights = array('b')
+        if np is not None:
+            self._buildVector()
+        else:
+            self._build()
+
+    def _build(self):
+        """
+        for every shift i bucket oligonucleotides by prefix of length k - i and match suffixes against buckets
+        shifts are visited in increasing order so the first match is the smallest weight - same as customDistance
+        """
+
+        codes = self.spectrum.codes
+        edges = [{} for _ in range(self.size)]
+        for shift in range(1, self.maxWeight + 1):
+            length = self.oligoLength - shift
+            suffixMask = (1 << 2 * length) - 1
+            buckets = {}
+            for index, code in enumerate(codes):
+                buckets.setdefault(code >> 2 * shift, []).append(index)
+
+            for index, code in enumerate(codes):
+                bucket = buckets.get(code & suffixMask)
+                if bucket is None:
+                    continue
+                row = edges[index]
+                for neighbour in bucket:
+                    if neighbour not in row:
+                        row[neighbour] = shift
+
+        for row in edges:
+            for j in sorted(row):
+                self.indices.append(j)
+                self.weights.append(row[j])
+            self.indptr.append(len(self.indices))
+
+    def _buildVector(self):
+        """
+        for every shift prefixes are sorted once, rows are processed in blocks - suffixes of block are found
+        in sorted prefixes (range of equal prefixes is one bucket) and pairs of all shifts are keyed
+        by i * size + j, np.unique with stable sort keeps the first (smallest) shift of every key
+        and returns keys sorted, which is the order of compressed sparse rows
+        """
+
+        size = self.size
+        codes = np.asarray(self.spectrum.codes, dtype=np.uint64)
+        shifts = range(1, self.maxWeight + 1)
+        buckets = []
+        for shift in shifts:
+            prefixes = codes >> np.uint64(2 * shift)
+            order = np.argsort(prefixes, kind="stable")
+            buckets.append((order, prefixes[order]))
+
+        for start in range(0, size, self.BLOCK):
+            block = codes[start:start + self.BLOCK]
+            keys = []
+            weights = []
+            for shift, (order, prefixes) in zip(shifts, buckets):
+                suffixes = block & np.uint64((1 << 2 * (self.oligoLength - shift)) - 1)
+                low = np.searchsorted(prefixes, suffixes, "left")
+                counts = np.searchsorted(prefixes, suffixes, "right") - low
+                total = int(counts.sum())
+                if not total:
+                    continue
+                rows = np.repeat(np.arange(len(block), dtype=np.int64), counts)
+                offsets = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts)
+                keys.append(rows * size + order[np.repeat(low, counts) + offsets])
+                weights.append(np.full(total, shift, dtype=np.int8))
+
+            rows = np.zeros(len(block), dtype=np.int64)
+            if keys:
+                keys, first = np.unique(np.concatenate(keys), return_index=True)
+                rows = np.bincount(keys // size, minlength=len(block))
+                self.indices.frombytes((keys % size).astype(np.int32).tobytes())
+                self.weights.frombytes(np.concatenate(weights)[first].tobytes())
+            self.indptr.frombytes((np.cumsum(rows) + self.indptr[-1]).astype(np.int64).tobytes())
+
+    def weight(self, i: int, j: int):
+        """
+        :param i: index of first oligonucleotide
+        :param j: index of second oligonucleotide
+        :return: weight of similarity - oligonucleotide length if there is no (stored) overlap
+        """
+        end = self.indptr[i + 1]
+        position = bisect_left(self.indices, j, self.indptr[i], end)
+        if position < end and self.indices[position] == j:
+            return self.weights[position]
+        return self.oligoLength
+
+    def pairs(self):
+        """
+        :return: generator of (i, j, weight) for every stored pair
+        """
+        for i in range(self.size):
+            for position in range(self.indptr[i], self.indptr[i + 1]):
+                yield i, self.indices[position], self.weights[position]
+
+    def toMatrix(self, size: int):
+        """
+        generate dense weights matrix, fields outside spectrum are filled with 0's
+        matrix is extended when spectrum (with positive mistakes) is bigger than size
+
+        :param size: size of matrix (size of sequence)
+        :return: weights matrix
+        """
+        length = self.size
+        size = max(size, length)
+        base = [self.oligoLength] * length + [0] * (size - length)
+        matrix = []
+        for i in range(size):
+            if i < length:
+                row = base[:]
+                for position in range(self.indptr[i], self.indptr[i + 1]):
+                    row[self.indices[position]] = self.weights[position]
+            else:
+                row = [0] * size
+            matrix.append(row)
+        return matrix
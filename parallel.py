@@ -0,0 +1,182 @@
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from random import Random
+from ant import Ant
+from graph import OverlapGraph, DenseGraph
+from instance import loadInstance
+from metrics import Metrics, NullMetrics
+
+
+# state of worker process, filled once by _initWorker
+_worker = {}
+
+
+def _graphArrays(graph):
+    """
+    :param graph: OverlapGraph or DenseGraph
+    :return: dictionary of arrays holding graph
+    """
+    if isinstance(graph, OverlapGraph):
+        return {"indptr": graph.indptr, "indices": graph.indices, "weights": graph.weights,
+                "pheromones": graph.pheromones}
+    return {"weights": graph.weights, "pheromones": graph.pheromones}
+
+
+def _attachArray(name: str, typecode: str, length: int):
+    """
+    attach to shared memory block and view it as array
+
+    :return: (shared memory, memoryview of typecode elements)
+    """
+    block = shared_memory.SharedMemory(name=name)
+    size = length * array(typecode).itemsize
+    return block, block.buf[:size].cast(typecode)
+
+
+def _initWorker(kind: str, size: int, oligoLength: int, blocks: dict, state: dict):
+    """
+    worker initializer - attach to shared graph arrays, other read only state is received once per worker
+
+    :param kind: "sparse" or "dense"
+    :param size: number of nodes
+    :param oligoLength: oligonucleotide length
+    :param blocks: dictionary name -> (shared memory name, typecode, length)
+    :param state: starter, spectrum, ranges, sequence_length, alpha, candidates, beta, metrics (flag indicating
+    if ants count their choices), optional instance_path - spectrum and ranges are then taken from memory mapped
+    instance file
+    """
+    views = {}
+    for name, (blockName, typecode, length) in blocks.items():
+        block, view = _attachArray(blockName, typecode, length)
+        _worker.setdefault("blocks", []).append(block)
+        views[name] = view
+
+    if kind == "sparse":
+        graph = OverlapGraph(size, oligoLength, views["indptr"], views["indices"], views["weights"],
+                             views["pheromones"], 0)
+    else:
+        graph = DenseGraph(size, oligoLength, views["weights"], views["pheromones"])
+    _worker["graph"] = graph
+    _worker.update(state)
+    if state.get("instance_path") is not None:
+        instance = loadInstance(state["instance_path"])
+        _worker["spectrum"] = instance.spectrum
+        _worker["ranges"] = instance.ranges
+
+
+def _runAnts(seeds: list, firstAttempt: bool, trail: tuple, background: float, extra: dict):
+    """
+    run ants in worker process on pheromones currently held in shared memory
+
+    :param seeds: seed of random numbers generator of every ant
+    :param firstAttempt: when true random choices are enabled
+    :param trail: (scale, low, high) of pheromones - see PheromoneTrail
+    :param background: pheromone of pairs which are not stored as edges (sparse graph)
+    :param extra: pheromones of not stored pairs visited by ants (sparse graph)
+    :return: (list of (route, deposits) of every ant, counters of ants e.g. {"fallback": 3})
+    """
+    graph = _worker["graph"]
+    graph.scale = trail[0]
+    graph.setBounds(trail[1], trail[2])
+    if isinstance(graph, OverlapGraph):
+        graph.background = background
+        graph.extra = extra
+
+    metrics = Metrics() if _worker.get("metrics") else NullMetrics()
+    results = []
+    for seed in seeds:
+        ant = Ant(_worker["starter"], _worker["spectrum"], graph, _worker["ranges"],
+                  _worker["sequence_length"], _worker["alpha"], firstAttempt, _worker["candidates"],
+                  _worker["beta"], Random(seed), metrics)
+        results.append(ant.run())
+    return results, getattr(metrics, "counters", {})
+
+
+class AntPool:
+    """
+    Class runs ants of iteration in pool of processes
+
+    Graph arrays are placed in shared memory, so only seeds of ants go to workers and only routes and
+    deposits come back. Pheromones are copied to shared memory once per iteration (updatePheromones).
+    Pheromones of not stored pairs of sparse graph (extra) are sent with every task, evaporated pairs are
+    dropped from extra (see OverlapGraph.evaporate), so its size is bounded by deposits of last iterations.
+    Every ant has own random numbers generator created from seed, so results do not depend on number of workers.
+
+    ___ATTRIBUTES___
+    self.workers - number of worker processes
+    self.graph - colony graph
+    self.metrics - Metrics to which counters of ants from workers are added
+    self._blocks - shared memory blocks
+    self._pheromones - view of shared pheromones
+    self._executor - pool of processes
+
+     ___METHODS___
+    run(self, seeds, firstAttempt) - run ants, returns list of (route, deposits) in order of seeds
+    close(self) - stop workers and release shared memory
+    """
+
+    def __init__(self, workers: int, graph, state: dict, metrics=None):
+        """
+        pool initialization
+
+        :param workers: number of worker processes
+        :param graph: colony graph (OverlapGraph or DenseGraph)
+        :param state: read only state passed once to every worker, see _initWorker
+        :param metrics: Metrics of colony, ants count their choices only when it is enabled
+        """
+
+        self.workers = workers
+        self.graph = graph
+        self.metrics = metrics if metrics is not None else NullMetrics()
+        state = dict(state, metrics=self.metrics.enabled)
+        self._blocks = []
+        blocks = {}
+        views = {}
+        for name, values in _graphArrays(graph).items():
+            typecode = values.format if isinstance(values, memoryview) else values.typecode
+            block = shared_memory.SharedMemory(create=True, size=max(len(values) * values.itemsize, 1))
+            self._blocks.append(block)
+            view = block.buf[:len(values) * values.itemsize].cast(typecode)
+            view[:] = values
+            views[name] = view
+            blocks[name] = (block.name, typecode, len(values))
+        self._pheromones = views.pop("pheromones")
+        for view in views.values():
+            view.release()
+
+        kind = "sparse" if isinstance(graph, OverlapGraph) else "dense"
+        self._executor = ProcessPoolExecutor(workers, initializer=_initWorker,
+                                             initargs=(kind, graph.size, graph.oligoLength, blocks, state))
+
+    def updatePheromones(self):
+        self._pheromones[:] = self.graph.pheromones
+
+    def run(self, seeds: list, firstAttempt: bool):
+        """
+        :param seeds: seed of random numbers generator of every ant
+        :param firstAttempt: when true random choices are enabled
+        :return: list of (route, deposits) in order of seeds
+        """
+        self.updatePheromones()
+        background = getattr(self.graph, "background", 0)
+        extra = getattr(self.graph, "extra", {})
+        chunk = -(-len(seeds) // self.workers)
+        trail = (self.graph.scale, self.graph.low, self.graph.high)
+        futures = [self._executor.submit(_runAnts, seeds[start:start + chunk], firstAttempt, trail, background,
+                                         extra)
+                   for start in range(0, len(seeds), chunk)]
+        results = []
+        for future in futures:
+            routes, counters = future.result()
+            results.extend(routes)
+            for name, value in counters.items():
+                self.metrics.count(name, value)
+        return results
+
+    def close(self):
+        self._executor.shutdown()
+        self._pheromones.release()
+        for block in self._blocks:
+            block.close()
+            block.unlink()
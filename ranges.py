@@ -0,0 +1,170 @@
+from array import array
+from bisect import bisect_right
+from heapq import heappop, heappush
+
+
+class RangeIndex:
+    """
+    Class holds ranges of every oligonucleotide occurrence sorted by position
+
+    Occurrences of every node are stored in compressed sparse row form and sorted by lower range, so occurrences
+    which are open at given position are found with binary search. Index is read only - consumption of
+    occurrences is tracked per ant by RangeCursor.
+
+    ___ATTRIBUTES___
+    self.size - number of nodes (spectrum size)
+    self.starts - occurrences of i-th node are stored on positions starts[i] .. starts[i + 1] - 1
+    self.lows - lower range of every occurrence
+    self.highs - upper range of every occurrence
+    self.nodes - node of every occurrence
+    self.order - occurrences numbers sorted by lower range (order of sweep over sequence)
+
+     ___METHODS___
+    copy(self) - copy of index held in own arrays
+    count(self, node) - number of occurrences of node
+    openOccurrences(self, node, position) - occurrences of node which contain position
+    """
+
+    def __init__(self, oligoDict: dict, translation: dict):
+        """
+        index initialization
+
+        :param oligoDict: dictionary of flat ranges lists produced by generator e.g. {"ACT": [0, 3, 7, 13]}
+        :param translation: dictionary binding oligonucleotides with nodes e.g. {"ACT": 0, "AGT": 1}
+        """
+
+        self.size = len(translation)
+        perNode = [[] for _ in range(self.size)]
+        for oligo, flat in oligoDict.items():
+            perNode[translation[oligo]] = sorted(zip(flat[0::2], flat[1::2]))
+
+        self.starts = array('i', [0])
+        self.lows = array('i')
+        self.highs = array('i')
+        self.nodes = array('i')
+        for node, occurrences in enumerate(perNode):
+            for low, high in occurrences:
+                self.lows.append(low)
+                self.highs.append(high)
+                self.nodes.append(node)
+            self.starts.append(len(self.lows))
+        self.order = array('i', sorted(range(len(self.lows)), key=self.lows.__getitem__))
+
+    @classmethod
+    def fromArrays(cls, starts, lows, highs, nodes, order):
+        """
+        build index from already prepared arrays (e.g. memory mapped instance file), arrays are not copied
+
+        :return: RangeIndex
+        """
+        index = cls.__new__(cls)
+        index.size = len(starts) - 1
+        index.starts = starts
+        index.lows = lows
+        index.highs = highs
+        index.nodes = nodes
+        index.order = order
+        return index
+
+    def copy(self):
+        """
+        :return: copy of index, arrays (or memoryviews of memory mapped file) are copied to new arrays
+        """
+        return RangeIndex.fromArrays(array('i', self.starts), array('i', self.lows), array('i', self.highs),
+                                     array('i', self.nodes), array('i', self.order))
+
+    def count(self, node: int):
+        return self.starts[node + 1] - self.starts[node]
+
+    def openOccurrences(self, node: int, position: int):
+        """
+        :param node: node number
+        :param position: position in sequence (sequence_cover)
+        :return: list of occurrences numbers (indexes of self.lows/self.highs) which contain position
+        """
+        start = self.starts[node]
+        end = bisect_right(self.lows, position, start, self.starts[node + 1])
+        return [occurrence for occurrence in range(start, end) if self.highs[occurrence] >= position]
+
+
+class RangeCursor:
+    """
+    Per ant view of RangeIndex - holds occurrences already used by ant
+
+    ___ATTRIBUTES___
+    self.index - shared RangeIndex
+    self.used - flag of every occurrence, 1 when ant already used it
+    self.remaining - number of unused occurrences of every node
+    self.open - nodes which have unused occurrence containing current position e.g. {3: None, 17: None}
+    self.position - current position of sweep
+
+     ___METHODS___
+    advance(self, position) - move sweep to position, update self.open
+    consume(self, node, position) - use occurrence of node which contains position
+    """
+
+    def __init__(self, index: RangeIndex):
+        self.index = index
+        self.used = bytearray(len(index.lows))
+        self.remaining = array('i', [index.count(node) for node in range(index.size)])
+        self._reset()
+
+    def _reset(self):
+        self.open = {}
+        self.position = -1
+        self._openCount = array('i', [0]) * self.index.size
+        self._next = 0
+        self._closing = []
+
+    def _close(self, occurrence: int):
+        node = self.index.nodes[occurrence]
+        self._openCount[node] -= 1
+        if not self._openCount[node]:
+            del self.open[node]
+
+    def advance(self, position: int):
+        """
+        sweep occurrences up to position - occurrences which starts are opened, occurrences which ends are closed
+        ant position (sequence_cover) only grows so every occurrence is opened and closed once
+
+        :param position: position in sequence (sequence_cover)
+        """
+        if position < self.position:
+            self._reset()
+        self.position = position
+
+        index = self.index
+        while self._next < len(index.order) and index.lows[index.order[self._next]] <= position:
+            occurrence = index.order[self._next]
+            self._next += 1
+            if index.highs[occurrence] >= position and not self.used[occurrence]:
+                node = index.nodes[occurrence]
+                self._openCount[node] += 1
+                self.open[node] = None
+                heappush(self._closing, (index.highs[occurrence], occurrence))
+
+        while self._closing and self._closing[0][0] < position:
+            _, occurrence = heappop(self._closing)
+            if not self.used[occurrence]:
+                self._close(occurrence)
+
+    def consume(self, node: int, position: int):
+        """
+        mark unused occurrence of node which contains position as used,
+        from open occurrences the one which closes first is chosen
+
+        :param node: node number
+        :param position: position in sequence (sequence_cover)
+        :return: flag indicating if occurrence was found
+        """
+        self.advance(position)
+        best = -1
+        for occurrence in self.index.openOccurrences(node, position):
+            if not self.used[occurrence] and (best < 0 or self.index.highs[occurrence] < self.index.highs[best]):
+                best = occurrence
+        if best < 0:
+            return False
+        self._close(best)
+        self.used[best] = 1
+        self.remaining[node] -= 1
+        return True
@@ -0,0 +1,136 @@
+from array import array
+from collections import OrderedDict
+from hashlib import blake2b
+
+
+def _patternMasks(pattern: str):
+    """
+    :param pattern: string
+    :return: dictionary character -> bit mask of positions of character in pattern
+    """
+    masks = {}
+    bit = 1
+    for character in pattern:
+        masks[character] = masks.get(character, 0) | bit
+        bit <<= 1
+    return masks
+
+
+def myersDistance(string1: str, string2: str, limit: int = None):
+    """
+    Calculate Levenshtein distance with Myers' bit-vector algorithm (Hyyro's variant for edit distance)
+    Whole column of dynamic programming matrix is kept in Python integers, so one character of string2
+    costs few big integer operations instead of len(string1) cell updates.
+
+    When limit is given computation stops as soon as distance has to be bigger than limit
+
+    :param string1: first string
+    :param string2: second string
+    :param limit: optional threshold e.g. best result so far
+    :return: Levenshtein distance or limit + 1 when distance exceeds limit
+    """
+    m = len(string1)
+    n = len(string2)
+    if limit is not None and abs(m - n) > limit:
+        return limit + 1
+    if m == 0:
+        return n
+    if n == 0:
+        return m
+
+    masks = _patternMasks(string1)
+    mask = (1 << m) - 1
+    highBit = 1 << (m - 1)
+    positive = mask
+    negative = 0
+    score = m
+
+    for column, character in enumerate(string2, 1):
+        equal = masks.get(character, 0)
+        xv = equal | negative
+        xh = (((equal & positive) + positive) ^ positive) | equal
+        horizontalPositive = negative | (~(xh | positive) & mask)
+        horizontalNegative = positive & xh
+        if horizontalPositive & highBit:
+            score += 1
+        elif horizontalNegative & highBit:
+            score -= 1
+        horizontalPositive = ((horizontalPositive << 1) | 1) & mask
+        horizontalNegative = (horizontalNegative << 1) & mask
+        positive = horizontalNegative | (~(xv | horizontalPositive) & mask)
+        negative = horizontalPositive & xv
+        # distance can drop by at most one per remaining column
+        if limit is not None and score - (n - column) > limit:
+            return limit + 1
+
+    return score
+
+
+def routeFingerprint(route: list):
+    """
+    :param route: route as node numbers e.g. [0, 17, 4] or array of integers
+    :return: 16 bytes hash of route
+    """
+    if not isinstance(route, array) or route.typecode != 'i':
+        route = array('i', route)
+    return blake2b(route.tobytes(), digest_size=16).digest()
+
+
+class ScoreCache:
+    """
+    Bounded LRU cache of route scores keyed by route fingerprint
+
+    Score computed with limit may be only lower bound (limit + 1), such entry is used only while
+    it still proves that distance exceeds asked limit.
+
+    ___ATTRIBUTES___
+    self.size - maximal number of entries
+    self.hits - number of answered lookups
+    self.misses - number of lookups which required scoring
+    self.evictions - number of removed entries
+
+     ___METHODS___
+    get(self, key, limit) - score of route or None
+    put(self, key, score, exact) - remember score of route
+    """
+
+    def __init__(self, size: int = 4096):
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()
+
+    def get(self, key: bytes, limit: int = None):
+        """
+        :param key: route fingerprint
+        :param limit: limit of scoring, see myersDistance
+        :return: score (limit + 1 when distance exceeds limit) or None
+        """
+        entry = self._entries.get(key)
+        if entry is not None:
+            score, exact = entry
+            if exact:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return score if limit is None or score <= limit else limit + 1
+            if limit is not None and score > limit:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return limit + 1
+        self.misses += 1
+        return None
+
+    def put(self, key: bytes, score: int, exact: bool):
+        """
+        :param key: route fingerprint
+        :param score: distance or its lower bound
+        :param exact: flag indicating if score is exact distance
+        """
+        if self.size <= 0:
+            return
+        self._entries[key] = (score, exact)
+        self._entries.move_to_end(key)
+        if len(self._entries) > self.size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
@@ -0,0 +1,90 @@
+import unittest
+from random import Random
+from ant import Ant
+from generator import Generator
+from graph import buildGraph
+from instance import Instance
+from localsearch import LocalSearch
+from metrics import Metrics
+from scoring import myersDistance
+from utilities import loadAntColony, mergeRoute
+
+
+class LocalSearchTest(unittest.TestCase):
+
+    def setUp(self):
+        generator = Generator(300, 6, 0.05, seed=7)
+        generator.generateSequence()
+        self.instance = Instance.fromGenerator(generator)
+        self.graph = buildGraph(self.instance.spectrum)
+        self.search = LocalSearch(self.graph, self.instance.ranges)
+
+    def _antRoute(self, seed: int, firstAttempt: bool = True):
+        """
+        :return: (route of ant, number of fallback choices - nodes chosen without open range)
+        """
+        metrics = Metrics()
+        ant = Ant(self.instance.starterNode, self.instance.spectrum, self.graph, self.instance.ranges,
+                  self.instance.dnaLength, 12, firstAttempt, rng=Random(seed), metrics=metrics)
+        route, _ = ant.run()
+        return list(route), metrics.counters.get("fallback", 0)
+
+    def testAntRouteHasNoViolations(self):
+        # ant chooses node from ranges open at sequence_cover, so only fallback choices can violate ranges
+        checked = 0
+        for seed in range(20):
+            route, fallbacks = self._antRoute(seed)
+            self.assertLessEqual(self.search.violations(route), fallbacks)
+            if not fallbacks:
+                self.assertEqual(self.search.violations(route), 0)
+                checked += 1
+        self.assertGreater(checked, 0)
+
+    def testImproveKeepsNodesAndViolations(self):
+        route, _ = self._antRoute(1)
+        improved, applied = self.search.improve(route)
+        self.assertEqual(sorted(improved), sorted(route))
+        self.assertEqual(improved[0], route[0])
+        self.assertLessEqual(self.search.violations(improved), self.search.violations(route))
+        weight = self.graph.weight
+        total = sum(weight(i, j) for i, j in zip(route, route[1:]))
+        improvedTotal = sum(weight(i, j) for i, j in zip(improved, improved[1:]))
+        self.assertTrue(improvedTotal < total or applied == 0)
+
+
+class IterationBestTest(unittest.TestCase):
+
+    def testImprovedRouteIsIterationBest(self):
+        # default deposit policy scores ants only up to the best result so far, local search still needs
+        # exact best ant of iteration
+        colony = loadAntColony()(ant_count=10, iterations=6, sequence_length=300, oligo_size=6, seed=2,
+                                 local_search=True, stop_on_exact=False)
+        colony.start()
+        runAnts = colony._runAnts
+        improve = colony.improver.improve
+        iteration = {}
+
+        def recordAnts():
+            iteration["routes"] = runAnts()
+            return iteration["routes"]
+
+        def recordImprove(route):
+            iteration["improved"] = list(route)
+            return improve(route)
+
+        colony._runAnts = recordAnts
+        colony.improver.improve = recordImprove
+        try:
+            for _ in range(colony.iterations):
+                colony.step()
+                exact = [myersDistance(mergeRoute(route, colony.initial_solution, colony.graph),
+                                       colony.instance.sequence) for route, _ in iteration["routes"]]
+                improved = myersDistance(mergeRoute(iteration["improved"], colony.initial_solution, colony.graph),
+                                         colony.instance.sequence)
+                self.assertEqual(improved, min(exact))
+        finally:
+            colony.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import unittest
+from random import Random
+import overlap
+from overlap import OverlapIndex
+from utilities import customDistance
+
+
+class OverlapIndexTest(unittest.TestCase):
+
+    @staticmethod
+    def _spectrum(random: Random, count: int, length: int):
+        # small alphabet subsets and short oligonucleotides give many overlaps of every weight
+        bases = random.choice(["ACGT", "AC", "A"])
+        oligos = {''.join(random.choice(bases) for _ in range(length)) for _ in range(count)}
+        return sorted(oligos)
+
+    def _assertSameWeights(self, spectrum: list, maxWeight: int = None):
+        index = OverlapIndex(spectrum, maxWeight)
+        length = len(spectrum[0])
+        limit = length - 1 if maxWeight is None else maxWeight
+        for i, first in enumerate(spectrum):
+            for j, second in enumerate(spectrum):
+                expected = customDistance(first, second)
+                self.assertEqual(index.weight(i, j), expected if expected <= limit else length)
+
+    def _assertBackends(self, check):
+        check()
+        numpy, overlap.np = overlap.np, None
+        try:
+            check()
+        finally:
+            overlap.np = numpy
+
+    def testWeightsEqualCustomDistance(self):
+        random = Random(3)
+
+        def check():
+            for _ in range(30):
+                length = random.randint(1, 12)
+                self._assertSameWeights(self._spectrum(random, random.randint(1, 60), length))
+
+        self._assertBackends(check)
+
+    def testMaxWeightDropsBiggerWeights(self):
+        random = Random(5)
+
+        def check():
+            for maxWeight in (0, 1, 3, 5):
+                self._assertSameWeights(self._spectrum(random, 50, 7), maxWeight)
+
+        self._assertBackends(check)
+
+    def testBlocksGiveSameArrays(self):
+        spectrum = self._spectrum(Random(7), 300, 6)
+        whole = OverlapIndex(spectrum)
+        block, OverlapIndex.BLOCK = OverlapIndex.BLOCK, 7
+        try:
+            blocked = OverlapIndex(spectrum)
+        finally:
+            OverlapIndex.BLOCK = block
+        self.assertEqual((whole.indptr, whole.indices, whole.weights),
+                         (blocked.indptr, blocked.indices, blocked.weights))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+from random import Random
+from scoring import myersDistance
+from utilities import levenshteinDistance
+
+
+class MyersDistanceTest(unittest.TestCase):
+
+    @staticmethod
+    def _pairs(random: Random, count: int):
+        for _ in range(count):
+            first = ''.join(random.choice("ACGT") for _ in range(random.randint(0, 150)))
+            # similar strings (few edits) as well as unrelated ones
+            if random.random() < 0.5:
+                second = ''.join(random.choice("ACGT") for _ in range(random.randint(0, 150)))
+            else:
+                second = list(first)
+                for _ in range(random.randint(0, 10)):
+                    position = random.randint(0, len(second))
+                    operation = random.randint(0, 2)
+                    if operation == 0 or not second or position == len(second):
+                        second.insert(position, random.choice("ACGT"))
+                    elif operation == 1:
+                        del second[position]
+                    else:
+                        second[position] = random.choice("ACGT")
+                second = ''.join(second)
+            yield first, second
+
+    def testSameAsLevenshteinDistance(self):
+        for first, second in self._pairs(Random(1), 300):
+            self.assertEqual(myersDistance(first, second), levenshteinDistance(first, second))
+
+    def testLimit(self):
+        random = Random(2)
+        for first, second in self._pairs(random, 300):
+            exact = levenshteinDistance(first, second)
+            limit = random.randint(0, exact + 5)
+            # exact distance within limit, limit + 1 above it
+            self.assertEqual(myersDistance(first, second, limit), min(exact, limit + 1))
+
+    def testEmptyStrings(self):
+        self.assertEqual(myersDistance("", ""), 0)
+        self.assertEqual(myersDistance("", "ACGT"), 4)
+        self.assertEqual(myersDistance("ACGT", ""), 4)
+        self.assertEqual(myersDistance("", "ACGT", 4), 4)
+        self.assertEqual(myersDistance("ACGT", "", 2), 3)
+
+    def testLengthDifferenceAboveLimit(self):
+        self.assertEqual(myersDistance("ACGTACGT", "AC", 5), 6)
+        self.assertEqual(myersDistance("AC", "ACGTACGT", 3), 4)
+        self.assertEqual(myersDistance("AC", "ACGTACGT", 6), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
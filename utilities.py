@@ -1,5 +1,8 @@
-from asyncio.windows_events import NULL
-from distutils.log import error
+from overlap import OverlapIndex
+from graph import buildGraph
+from importlib.util import module_from_spec, spec_from_file_location
+import os
+import sys
 
 
 def customDistance(oligo1: str, oligo2: str):
@@ -60,29 +63,50 @@ def generateWeightsMatrix(size: int, spectrum: list):
     :return: weights matrix
     """
 
-    weightsMatrix = [[0 for _ in range(size)] for _ in range(size)]
-    length = len(spectrum)
-    for i in range(length):
-        for j in range(length):
-            weightsMatrix[i][j] = customDistance(spectrum[i], spectrum[j])
-    return weightsMatrix
+    return OverlapIndex(spectrum).toMatrix(size)
+
+
+def generateGraph(spectrum: list, denseLimit: int = 2000, maxWeight: int = None):
+    """
+    generate overlap graph holding weights and pheromones (initialized to 0.1) of spectrum
+
+    :param spectrum: list of nucleotide names
+    :param denseLimit: biggest spectrum size for which dense graph is built
+    :param maxWeight: biggest weight stored in sparse graph, every overlap is stored by default (see buildGraph)
+    :return: graph shared by ants and colony
+    """
+    return buildGraph(spectrum, 0.1, denseLimit, maxWeight)
 
 
 def mergeSolution(solution: list, oligonucleotide_size: int):
     """
-    Concatenate oligonucleotides in one sequence
+    Concatenate oligonucleotides in one sequence, solution is not modified
 
     :param solution: solution created after ant journey
     :param oligonucleotide_size: oligonucleotide size
     :return: DNA sequence
     """
-    result = solution[0]
-    while len(solution) != 1:
-        dist = customDistance(solution[0], solution[1])
-        tmp = solution[1][oligonucleotide_size - dist: oligonucleotide_size]
-        result += tmp
-        solution.remove(solution[0])
-    return result
+    parts = [solution[0]]
+    for previous, oligonucleotide in zip(solution, solution[1:]):
+        dist = customDistance(previous, oligonucleotide)
+        parts.append(oligonucleotide[oligonucleotide_size - dist: oligonucleotide_size])
+    return ''.join(parts)
+
+
+def mergeRoute(route: list, spectrum: list, graph):
+    """
+    Concatenate oligonucleotides of route in one sequence using weights already stored in graph
+
+    :param route: route as node numbers e.g. [0, 17, 4]
+    :param spectrum: list of oligonucleotides ordered as graph nodes
+    :param graph: overlap graph (OverlapGraph or DenseGraph)
+    :return: DNA sequence
+    """
+    size = graph.oligoLength
+    parts = [spectrum[route[0]]]
+    for previous, node in zip(route, route[1:]):
+        parts.append(spectrum[node][size - graph.weight(previous, node):])
+    return ''.join(parts)
 
 
 def levenshteinDistance(string1 : str, string2 : str):
@@ -94,8 +118,8 @@ def levenshteinDistance(string1 : str, string2 : str):
     :param string2: second string
     :return: numerical difference between strings
     """
-    if string1 == NULL or string2 == NULL:
-        error("Invalid parameters")
+    if string1 is None or string2 is None:
+        raise ValueError("Invalid parameters")
     
     n = len(string1); m = len(string2)
 
@@ -119,4 +143,19 @@ def levenshteinDistance(string1 : str, string2 : str):
         prevCost, cost = cost, prevCost
 
     return prevCost[n]
-    
\ No newline at end of file
+    
+
+
+def loadAntColony():
+    """
+    import AntColony class from "Ant colony.py" - file name is not a valid module name
+
+    :return: AntColony class
+    """
+    if "ant_colony" not in sys.modules:
+        path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "Ant colony.py")
+        spec = spec_from_file_location("ant_colony", path)
+        module = module_from_spec(spec)
+        sys.modules["ant_colony"] = module
+        spec.loader.exec_module(module)
+    return sys.modules["ant_colony"].AntColony